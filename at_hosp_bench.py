@@ -0,0 +1,376 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# benchmark of at_hosp_csv2excel.py with synthetic AGES and KAZ data
+#
+#   python at_hosp_bench.py [-s 1,10,100] [-o bench_results.json] [-d workdir] [-k]
+#
+#   -s, --scales  scale factors of the source files (default 1,10)
+#   -o, --out     json file with the results
+#   -d, --dir     work dir for the generated files (default: temp dir)
+#   -k, --keep    keep the generated files
+#
+# runs offline, the download stages fetch the generated files from a local
+# mirror (at_hosp_mirror.py). The row counts at scale 1 are about the size
+# of the AGES files in 2023, see BASE_*.
+#
+# Author:      <plix1014@gmail.com>
+#
+# Created:     18.10.2026
+# Copyright:   (c) 2021
+# Licence:     CC BY-NC-SA http://creativecommons.org/licenses/by-nc-sa/4.0/
+#-------------------------------------------------------------------------------
+
+import os, getopt, sys
+import io
+import time
+import json
+import shutil
+import threading
+import platform
+import tempfile
+#
+from datetime import date, timedelta, datetime
+
+import numpy as np
+import pandas as pd
+
+import openpyxl
+from openpyxl import Workbook
+from openpyxl.styles import PatternFill, Font
+
+import at_hosp_csv2excel as hosp
+import at_hosp_mirror as mirror
+
+
+# report days at scale 1
+BASE_DAYS_FALL = 1100
+BASE_DAYS_EW   = 1100
+BASE_DAYS_VA   = 250
+# rows per sheet of the KAZ workbook at scale 1
+BASE_KAZ_ROWS  = 40
+
+# last report date of the synthetic data
+LAST_DAY = date(2023, 4, 21)
+
+# days written per block
+BLOCK_DAYS = 20
+
+BUNDESLAENDER = ['Burgenland', 'Kärnten', 'Niederösterreich', 'Oberösterreich', 'Salzburg',
+                 'Steiermark', 'Tirol', 'Vorarlberg', 'Wien']
+
+AGE_GROUPS = ['00-11', '12-17', '18-24', '25-34', '35-44', '45-54', '55-64', '65+']
+GENDERS    = ['Female', 'Male']
+VACCINES   = ['AstraZeneca', 'BioNTechPfizer', 'JanssenCilag', 'Moderna']
+DOSES      = [1, 2, 3, 4, 5]
+
+# --------------------------------------------------------------------
+
+def day_blocks(days):
+    """ blocks of report dates, the last day is LAST_DAY
+    """
+    first = LAST_DAY - timedelta(days=days - 1)
+
+    for start in range(0, days, BLOCK_DAYS):
+        yield [first + timedelta(days=d) for d in range(start, min(start + BLOCK_DAYS, days))]
+
+
+def write_blocks(fout, blocks):
+    """ write dataframes to one csv file
+    """
+    header = True
+    rows   = 0
+
+    with open(fout, 'w', encoding='utf-8', newline='') as f:
+        for df in blocks:
+            df.to_csv(f, sep=';', decimal=',', index=False, header=header)
+            header = False
+            rows  += len(df)
+
+    return rows
+
+
+def gen_fallzahlen(fout, scale, rng):
+    """ synthetic CovidFallzahlen.csv
+    """
+    def blocks():
+        names = BUNDESLAENDER + ['Alle']
+        for days in day_blocks(BASE_DAYS_FALL * scale):
+            n = len(days) * len(names)
+            d = np.repeat([x.strftime('%d.%m.%Y') for x in days], len(names))
+            yield pd.DataFrame({ 'Meldedat'    : d,
+                                 'TestGesamt'  : rng.integers(0, 10**7, n),
+                                 'MeldeDatum'  : np.char.add(d.astype(str), ' 00:00:00'),
+                                 'FZHosp'      : rng.integers(0, 2000, n),
+                                 'FZICU'       : rng.integers(0, 500, n),
+                                 'FZHospFree'  : rng.integers(0, 2000, n),
+                                 'FZICUFree'   : rng.integers(0, 500, n),
+                                 'BundeslandID': np.tile(np.arange(1, len(names) + 1), len(days)),
+                                 'Bundesland'  : np.tile(names, len(days)),
+                               })
+
+    return write_blocks(fout, blocks())
+
+
+def gen_einwohner(fout, scale, rng):
+    """ synthetic CovidFaelle_Altersgruppe.csv
+    """
+    def blocks():
+        names  = BUNDESLAENDER + ['Österreich']
+        groups = range(1, 11)
+        per_day = len(names) * len(groups) * 2
+
+        for days in day_blocks(BASE_DAYS_EW * scale):
+            n = len(days) * per_day
+            yield pd.DataFrame({ 'AltersgruppeID': np.tile(np.repeat(list(groups), 2), len(days) * len(names)),
+                                 'Altersgruppe'  : np.tile(np.repeat(['<%d' % (g * 10) for g in groups], 2), len(days) * len(names)),
+                                 'Bundesland'    : np.tile(np.repeat(names, len(groups) * 2), len(days)),
+                                 'BundeslandID'  : np.tile(np.repeat(np.arange(1, len(names) + 1), len(groups) * 2), len(days)),
+                                 'AnzEinwohner'  : rng.integers(10000, 100000, n),
+                                 'Geschlecht'    : np.tile(['M', 'W'], n // 2),
+                                 'Anzahl'        : rng.integers(0, 50000, n),
+                                 'AnzahlGeheilt' : rng.integers(0, 50000, n),
+                                 'AnzahlTot'     : rng.integers(0, 500, n),
+                                 'Time'          : np.repeat([x.strftime('%d.%m.%Y 00:00:00') for x in days], per_day),
+                               })
+
+    return write_blocks(fout, blocks())
+
+
+def gen_impfungen(fout, scale, rng):
+    """ synthetic COVID19_vaccination_agegroups_v202210.csv
+    """
+    def blocks():
+        states = ['NoState'] + BUNDESLAENDER
+        combos = pd.MultiIndex.from_product([range(len(states)), AGE_GROUPS, GENDERS, VACCINES, DOSES]).to_frame(index=False)
+        per_day = len(combos)
+
+        for days in day_blocks(BASE_DAYS_VA * scale):
+            n = len(days) * per_day
+            sid = np.tile(combos[0].values, len(days))
+            yield pd.DataFrame({ 'date'       : np.repeat([x.strftime('%Y-%m-%dT23:59:59+02:00') for x in days], per_day),
+                                 'state_id'   : sid,
+                                 'state_name' : np.array(states)[sid],
+                                 'age_group'  : np.tile(combos[1].values, len(days)),
+                                 'gender'     : np.tile(combos[2].values, len(days)),
+                                 'vaccine'    : np.tile(combos[3].values, len(days)),
+                                 'vaccination': np.tile(combos[4].values, len(days)),
+                                 'vaccinations_administered_cumulative': rng.integers(0, 10**6, n),
+                               })
+
+    return write_blocks(fout, blocks())
+
+
+def gen_kaz(fout, scale, rng):
+    """ synthetic 11_T_Betten_Fachr.xlsx, the last sheet is used
+    """
+    wb = Workbook()
+    wb.remove(wb.active)
+
+    fill = PatternFill(patternType='solid', start_color='ffeadc')
+    bold = Font(bold=True)
+    rows = BASE_KAZ_ROWS * scale
+
+    for year in ['2017', '2018', '2019']:
+        ws = wb.create_sheet(year)
+        ws.append(['Tatsächlich aufgestellte Betten nach Fachrichtungen'])
+        ws.append([year])
+        ws.append([])
+        ws.append(['', 'Österreich', 'BGLD', 'KTN', 'NÖ', 'OÖ', 'SBG', 'STM', 'TIR', 'VLB', 'WIEN'])
+        ws['A1'].font = bold
+
+        for r in range(rows):
+            beds = rng.integers(10, 3000, 9).tolist()
+            ws.append(['Fachrichtung %d' % r, sum(beds)] + beds)
+            ws.cell(row=ws.max_row, column=1).font = bold
+            ws.cell(row=ws.max_row, column=2).fill = fill
+            ws.cell(row=ws.max_row, column=2).number_format = '#,##0'
+
+    wb.save(fout)
+
+    return rows
+
+
+def generate(ddir, scale):
+    """ write all synthetic source files for scale, returns row counts
+    """
+    rng = np.random.default_rng(scale)
+
+    rows = {}
+    rows[hosp.AGES_FALL]      = gen_fallzahlen(os.path.join(ddir, hosp.AGES_FALL), scale, rng)
+    rows[hosp.AGES_Einwohner] = gen_einwohner(os.path.join(ddir, hosp.AGES_Einwohner), scale, rng)
+    rows[hosp.AGES_IMPFUNG]   = gen_impfungen(os.path.join(ddir, hosp.AGES_IMPFUNG), scale, rng)
+    rows[hosp.KAZ_BETTEN]     = gen_kaz(os.path.join(ddir, hosp.KAZ_BETTEN), scale, rng)
+
+    return rows
+
+
+def timed(results, name, func, *args):
+    """ run func and record wall and cpu time under name
+    """
+    hosp.print_dbg(hosp.INFO, "  %s" % name)
+
+    t0 = time.perf_counter()
+    c0 = time.process_time()
+
+    res = func(*args)
+
+    results[name] = { 'wall': round(time.perf_counter() - t0, 4),
+                      'cpu' : round(time.process_time() - c0, 4),
+                    }
+    return res
+
+
+def format_sheets(df):
+    """ formatting stage: styles and column widths of the result sheets
+    """
+    wb = Workbook(write_only=True)
+
+    for sn, frame in [('Intensiv', df[1]), ('Total', df[2].tail(10)), ('Impfungen', df[3])]:
+        ws = wb.create_sheet(sn)
+        head, styles = hosp.sheet_styles(ws, sn, len(frame.columns) + 1)
+        hosp.column_widths(frame, styles)
+
+
+def copy_kaz(xls):
+    """ sheet copy stage: KAZ sheet into a new workbook
+
+        the workbook is saved to memory, so the stage includes the xml
+        serialization and the write-only sheet is closed
+    """
+    wb = Workbook(write_only=True)
+    hosp.write_kaz_sheet(wb, hosp.load_kaz(xls)['sheet'], hosp.KAZ_SHEET)
+    wb.save(io.BytesIO())
+
+
+def time_downloads(stages, ddir, home):
+    """ download the files of ddir from a local mirror into home, then
+        poll them again with conditional requests
+    """
+    server = mirror.make_server(ddir, '127.0.0.1', 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    hosp.data_home = home
+    hosp.MIRROR    = 'http://127.0.0.1:%d/' % server.server_address[1]
+    hosp.ARCHIVE   = False
+    try:
+        hosp.make_data_dir()
+        timed(stages, 'download', hosp.download_files)
+        timed(stages, 'download_not_modified', hosp.download_files, True)
+    finally:
+        hosp.MIRROR = None
+        server.shutdown()
+        server.server_close()
+
+
+def run_scale(workdir, scale):
+    """ generate sources for scale and time every stage
+    """
+    ddir = os.path.join(workdir, 'scale_%d' % scale, hosp.subdir)
+    os.makedirs(ddir, exist_ok=True)
+
+    hosp.print_dbg(hosp.INFO, "scale %d: generating sources in %s" % (scale, ddir))
+
+    t0 = time.perf_counter()
+    rows = generate(ddir, scale)
+    gen_time = round(time.perf_counter() - t0, 4)
+
+    stages = {}
+
+    hosp.print_dbg(hosp.INFO, "scale %d: running stages" % scale)
+    time_downloads(stages, ddir, os.path.join(workdir, 'scale_%d' % scale, 'download') + hosp.DIR_SEP)
+
+    # the generator reads from <data_home><subdir>
+    hosp.data_home = os.path.join(workdir, 'scale_%d' % scale) + hosp.DIR_SEP
+    hosp.CACHE       = False
+    hosp.INCREMENTAL = False
+
+    engines = ['c', 'pyarrow'] if hosp.importlib.util.find_spec('pyarrow') else ['c']
+    for engine in engines:
+        hosp.CSV_ENGINE = engine
+        for fn in [hosp.AGES_FALL, hosp.AGES_Einwohner, hosp.AGES_IMPFUNG]:
+            timed(stages, 'import_ages_csv2df[%s]:%s' % (engine, fn), hosp.import_ages_csv2df, fn, ';', ',', 'Datum', hosp.CSV_SCHEMAS[fn])
+    hosp.CSV_ENGINE = 'auto'
+
+    hosp.KAZ_LOADED.clear()
+    timed(stages, 'read_xlsx', hosp.read_xlsx, hosp.KAZ_BETTEN)
+
+    hosp.KAZ_LOADED.clear()
+    hosp.BUILT.clear()
+    df = timed(stages, 'run_build', hosp.run_build)
+
+    timed(stages, 'format_cells', format_sheets, df)
+    timed(stages, 'copy_kaz_sheet', copy_kaz, hosp.KAZ_BETTEN)
+    timed(stages, 'export_df', hosp.export_df, df, hosp.AT_HOSP)
+
+    return { 'rows'    : rows,
+             'generate': gen_time,
+             'xlsx_bytes': os.path.getsize(os.path.join(ddir, hosp.AT_HOSP)),
+             'stages'  : stages,
+           }
+
+
+def usage():
+    print("usage: %s [-s 1,10,100] [-o bench_results.json] [-d workdir] [-k]" % os.path.basename(sys.argv[0]))
+
+
+# --------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "hs:o:d:k", ["help", "scales=", "out=", "dir=", "keep"])
+    except getopt.GetoptError as e:
+        print(e)
+        usage()
+        sys.exit(2)
+
+    scales  = [1, 10]
+    fout    = 'bench_results.json'
+    workdir = None
+    keep    = False
+
+    for o, a in opts:
+        if o in ("-h", "--help"):
+            usage()
+            sys.exit(0)
+        elif o in ("-s", "--scales"):
+            scales = [int(x) for x in a.split(',')]
+        elif o in ("-o", "--out"):
+            fout = a
+        elif o in ("-d", "--dir"):
+            workdir = a
+        elif o in ("-k", "--keep"):
+            keep = True
+
+    hosp.VERBOSE = False
+
+    if workdir is None:
+        workdir = tempfile.mkdtemp(prefix='at_hosp_bench_')
+    else:
+        os.makedirs(workdir, exist_ok=True)
+
+    results = { 'created' : datetime.now().isoformat(timespec='seconds'),
+                'python'  : platform.python_version(),
+                'pandas'  : pd.__version__,
+                'openpyxl': openpyxl.__version__,
+                'scales'  : {},
+              }
+
+    try:
+        for scale in scales:
+            results['scales'][str(scale)] = run_scale(workdir, scale)
+
+            with open(fout, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+    finally:
+        if not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    for scale, res in results['scales'].items():
+        print("scale %s" % scale)
+        for name, t in res['stages'].items():
+            print("  %-60s %10.3fs  cpu %10.3fs" % (name, t['wall'], t['cpu']))
+
+    hosp.print_dbg(hosp.INFO, "results written to %s" % fout)
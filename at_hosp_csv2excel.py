@@ -14,22 +14,26 @@
 # Licence:     CC BY-NC-SA http://creativecommons.org/licenses/by-nc-sa/4.0/
 #-------------------------------------------------------------------------------
 
-import ssl
 import time
 import os, getopt, sys
+import json
+import hashlib
+import importlib.util
+import tempfile
+import tracemalloc
 #
-from datetime import date, timedelta, datetime
-import requests
+from contextlib import contextmanager
 #
-import pandas as pd
-
-import openpyxl
+from datetime import date, timedelta, datetime
 
-from openpyxl.worksheet.dimensions import ColumnDimension, DimensionHolder
-from openpyxl.utils import get_column_letter
-from openpyxl.styles import PatternFill
-from openpyxl import Workbook
-from openpyxl import load_workbook
+try:
+    import resource
+except ImportError:
+    # not available on windows
+    resource = None
+#
+# pandas, requests and openpyxl are imported in the functions using them,
+# so 'check' does not pay for loading them
 from copy import copy
 
 
@@ -38,6 +42,7 @@ INFO    = True
 VERBOSE = True
 DEBUG   = False
 TRACE   = False
+ERROR   = True
 
 # temp dir
 TMP = '/tmp'
@@ -50,10 +55,62 @@ if sys.platform == "win32":
 data_home = '.' + DIR_SEP
 subdir    = 'data'
 
-# create data dir
-if not os.path.exists(data_home + subdir):
-    os.makedirs(data_home + subdir)
 
+# timing and memory of each stage, report in data dir
+STATS_FILE  = 'at_hosp_stats.json'
+# --profile: cProfile and tracemalloc dumps of each stage in PROFILE_DIR
+PROFILE     = False
+PROFILE_DIR = 'profile'
+
+# recorded stages, stack of running stages
+STAGE_STATS = []
+STAGE_STACK = []
+
+# file with ETag/Last-Modified of the last downloads
+DOWNLOAD_META    = 'download_meta.json'
+# parallel downloads, timeout in seconds and size of streamed blocks
+DOWNLOAD_WORKERS = 4
+DOWNLOAD_TIMEOUT = 60
+DOWNLOAD_CHUNK   = 1024 * 1024
+
+# cache for parsed source files
+CACHE         = True
+CACHE_DIR     = 'cache'
+CACHE_MAX_MB  = 1024
+# bump if the parsing of the source files changes
+CACHE_VERSION = 8
+
+# the vaccination csv is read in chunks, memory budget of one chunk. The
+# parser holds the raw lines and the parsed columns of a chunk, about
+# CSV_PARSE_FACTOR times the bytes of the lines. Only this buffer is
+# bounded, the prepared chunks are kept until they are joined
+VA_MEM_BUDGET_MB = 256
+CSV_PARSE_FACTOR = 2
+# sum up vaccinations per date and these columns, None keeps all rows
+# e.g. ['state_id', 'state_name', 'vaccination']
+VA_AGGREGATE     = None
+
+# every downloaded version of the sources, gzip compressed and stored once
+# per content hash in ARCHIVE_DIR/objects. A version that only appends to
+# the previous one is stored as delta, at most ARCHIVE_MAX_DEPTH in a row
+ARCHIVE           = True
+ARCHIVE_DIR       = 'archive'
+ARCHIVE_OBJECTS   = 'objects'
+ARCHIVE_INDEX     = 'index.json'
+ARCHIVE_MAX_DEPTH = 30
+# rebuild from the archived sources of this day (yyyy-mm-dd)
+AS_OF             = None
+
+# process only new report dates, derived rows are kept in STATE_DIR
+INCREMENTAL   = False
+STATE_DIR     = 'state'
+
+# build only report dates in the window since..until (yyyy-mm-dd) or of the
+# last WINDOW_LAST days, rows outside are dropped while the csv is read.
+# Windowed builds use neither the cache nor the state of INCREMENTAL
+WINDOW_SINCE  = None
+WINDOW_UNTIL  = None
+WINDOW_LAST   = None
 
 headers_agent  = {'User-Agent' : 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14_6) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0.3 Safari/605.1.15'}
 
@@ -65,6 +122,9 @@ URL_DATA2 = 'https://info.gesundheitsministerium.at/data/'
 # http://www.kaz.bmg.gv.at/fileadmin/user_upload/Betten/11_T_Betten_Fachr.xlsx
 URL_KAZ = 'http://www.kaz.bmg.gv.at/fileadmin/user_upload/Betten/'
 
+# base url of a local mirror (at_hosp_mirror.py), used instead of the URLs above
+MIRROR = None
+
 # input source files
 KAZ_BETTEN     = '11_T_Betten_Fachr.xlsx'
 AGES_FALL      = 'CovidFallzahlen.csv'
@@ -74,8 +134,64 @@ AGES_IMPFUNG   = 'timeline-eimpfpass.csv'
 AGES_IMPFUNG   = 'COVID19_vaccination_agegroups_v202210.csv'
 AGES_IMPFUNG2  = 'COVID19_vaccination_timeline_v202210.csv'
 
-# default name of sheet in KAZ_BETTEN
-source_sheet_name = '2019'
+SOURCE_FILES   = [ AGES_FALL, AGES_Einwohner, KAZ_BETTEN, AGES_IMPFUNG ]
+
+# column types of AGES_IMPFUNG
+VA_DTYPES = { 'date'                                : 'category',
+              'state_id'                            : 'Int16',
+              'state_name'                          : 'category',
+              'age_group'                           : 'category',
+              'gender'                              : 'category',
+              'vaccine'                             : 'category',
+              'vaccination'                         : 'Int8',
+              'vaccinations_administered_cumulative': 'Int64',
+            }
+
+# columns and types read from the source files, the other columns are skipped
+CSV_SCHEMAS = { AGES_FALL     : { 'usecols': [ 'Meldedat', 'TestGesamt', 'FZHosp', 'FZICU', 'FZHospFree', 'FZICUFree', 'Bundesland' ],
+                                  'dtype'  : { 'Meldedat': 'category', 'Bundesland': 'str' } },
+                AGES_Einwohner: { 'usecols': [ 'Time', 'Bundesland', 'AnzEinwohner' ],
+                                  'dtype'  : { 'Time': 'category', 'Bundesland': 'category' } },
+                AGES_IMPFUNG  : { 'usecols': list(VA_DTYPES),
+                                  'dtype'  : VA_DTYPES },
+              }
+
+# csv parser: 'pyarrow' multithreaded reader, 'c' default engine of pandas,
+# 'auto' uses pyarrow if it is installed
+CSV_ENGINE       = 'auto'
+CSV_ENGINES      = [ 'auto', 'pyarrow', 'c' ]
+# columns read by pyarrow stay Arrow backed (pd.ArrowDtype), categories stay categorical
+CSV_ARROW_DTYPES = False
+# threads of the pyarrow reader, None uses all cores
+ARROW_THREADS    = None
+
+# date layouts in AGES files, fixed positions of year, month, day
+#   iso: 2023-04-21T23:59:59+02:00
+#   dmy: 26.02.2020 00:00:00
+DATE_LAYOUTS = { 'iso': ((0,4), (5,7), (8,10)),
+                 'dmy': ((6,10), (3,5), (0,2)),
+               }
+
+# KAZ_BETTEN parsed in this process
+KAZ_LOADED = {}
+
+# frames built in this process and their sources, see built_frame()
+BUILT = {}
+BUILD_SOURCES = { 'fallzahlen': [ AGES_FALL, AGES_Einwohner, KAZ_BETTEN ],
+                  'impfungen' : [ AGES_IMPFUNG ],
+                }
+
+# watch: seconds between polls of the sources
+WATCH_INTERVAL = 900
+
+# source files are parsed in a pool of processes, 1 parses them one after the other
+PARSE_WORKERS   = min(4, os.cpu_count() or 1)
+PARSE_POOL_MIN_MB = 32
+# settings passed to the worker processes
+WORKER_SETTINGS = [ 'data_home', 'subdir', 'INFO', 'VERBOSE', 'DEBUG', 'TRACE', 'ERROR',
+                    'CACHE', 'CACHE_MAX_MB', 'INCREMENTAL', 'VA_MEM_BUDGET_MB', 'VA_AGGREGATE',
+                    'CSV_ENGINE', 'CSV_ARROW_DTYPES', 'WINDOW_SINCE', 'WINDOW_UNTIL', 'WINDOW_LAST',
+                    'XLSX_UPDATE' ]
 
 # statistik austria
 # https://www.statistik.at/web_de/statistiken/menschen_und_gesellschaft/bevoelkerung/bevoelkerungsstand_und_veraenderung/bevoelkerung_zu_jahres-_quartalsanfang/index.html
@@ -84,18 +200,96 @@ source_sheet_name = '2019'
 # output file
 AT_HOSP     = 'AT_Hospitalisierung.xlsx'
 
-# store Einwohner from AGES_Einwohner
-BL_Einwohner = { 'Burgenland': 0,
-          'Kärnten'          : 0,
-          'Niederösterreich' : 0,
-          'Oberösterreich'   : 0,
-          'Salzburg'         : 0,
-          'Steiermark'       : 0,
-          'Tirol'            : 0,
-          'Vorarlberg'       : 0,
-          'Wien'             : 0,
-          'Österreich'       : 0
-          }
+# sheet with copy of KAZ_BETTEN in AT_HOSP
+KAZ_SHEET   = 'BettenFachrichtung'
+
+# update mode: only the sheets whose input changed are written, the xml
+# of the other sheets is copied from the previous workbook. The inputs of
+# each sheet are recorded in XLSX_MANIFEST next to the workbook
+XLSX_UPDATE   = False
+XLSX_MANIFEST = '%s_manifest.json'
+# openpyxl numbers the sheet parts of the package by position
+XLSX_SHEET_PART = 'xl/worksheets/sheet%d.xml'
+
+# output formats, see EXPORTERS. Other formats than xlsx write the tables
+# to files named like AT_HOSP, e.g. AT_Hospitalisierung_Impfungen.parquet
+EXPORT_FORMATS = [ 'xlsx' ]
+EXPORT_TABLES  = [ 'Intensiv', 'Total', 'Impfungen' ]
+
+# batch: keys of a target in the config file, frames shared with the worker
+# processes writing the targets
+TARGET_KEYS  = [ 'output', 'format', 'bundesland', 'sheets', 'columns', 'rollup' ]
+BATCH_FRAMES = None
+
+# formats of the result sheets, columns start with 1 (index column)
+#   pct  : columns with percentage format
+#   fill : colored columns, colors from COL_PATTERN
+#   float: columns with FMT_FLOAT, the last column always gets FMT_FLOAT
+SHEET_FORMATS = { 'Intensiv' : { 'pct': [6,10,11,20,21], 'fill': [ 8,9,10,11,12,13], 'float': [15,16,17,18,19] },
+                  'Total'    : { 'pct': [6,8,11,12],       'fill': [ 9,10,11,12,13,14,15,16] },
+                  # delete or use calculated column
+                  'Impfungen': { 'pct': [10],              'fill': [ 10] },
+                }
+
+# columns of the result sheets, the positions of SHEET_FORMATS refer to them
+SHEET_COLUMNS = {
+    #              B            C        D            E                  F                  G       H           I                 J
+    'Intensiv' : ['TestGesamt','FZHosp','FZHospFree','Norm. zugewiesen','Norm. Auslastung','FZICU','FZICUFree','ICU zugewiesen', 'ICU Auslastung',
+        'ICU Anteil f. Corona','ICU Betten gesamt','Bundesland','Einwohner', 'ICU Betten gesamt pro 100T',
+    #    K                      L                   M            N              O
+        'FZHosp 7T Mittel','FZHosp 14T Mittel','FZICU 7T Mittel','FZICU 14T Mittel','FZHosp Veränderung','FZICU Veränderung',
+        'Hospitalisiert pro 100T'],
+    #    P                  Q                   R                 S                  T                    U
+    #    V
+
+    #              B            C        D            E                  F                  G       H                    I           J
+    'Total'    : ['TestGesamt','FZHosp','FZHospFree','Norm. zugewiesen','Norm. Auslastung','FZICU','v. Intensiv Total', 'FZICUFree','ICU zugewiesen',
+        'ICU Auslastung', 'ICU Anteil f. Corona','ICU Betten gesamt','Bundesland','Einwohner', 'ICU Betten gesamt pro 100T'],
+    #    K                 L                      M                   N            O            P
+
+    'Impfungen': list(VA_DTYPES) + ['vaccinations_administered_cumulativeP'],
+}
+
+# days of the rolling means of FZHosp and FZICU
+TREND_WINDOWS = [ 7, 14 ]
+
+# rows of an xlsx sheet, including the header. Taller frames are split
+XLSX_MAX_ROWS = 1048576
+
+# write sums per date, state and dose to sheet Impfungen and all rows
+# to AT_Hospitalisierung_Impfungen.parquet (or .csv.gz)
+VA_ROLLUP         = False
+VA_ROLLUP_COLUMNS = [ 'state_id', 'state_name', 'vaccination' ]
+
+# text columns of taller sheets are measured on a sample of rows
+WIDTH_SAMPLE_ROWS = 100000
+
+FMT_DATE  = 'yyyy-mm-dd'
+FMT_PCT   = '0.00%'
+FMT_FLOAT = '#,#0.0'
+
+# column colors
+col_green = 'b3d09a'
+col_brick = 'ffeadc'
+col_blue  = 'e1eefa'
+col_gold  = 'fff4d2'
+col_lime  = 'e7e0f0'
+col_gray  = 'f1f1f1'
+
+COL_PATTERN = [ col_green,col_brick,col_blue,col_gold,col_lime, col_gray, col_gray,col_gray,col_gray,]
+
+# Bundeslaender in AGES_Einwohner and KAZ_BETTEN
+BUNDESLAENDER = [ 'Burgenland',
+                  'Kärnten',
+                  'Niederösterreich',
+                  'Oberösterreich',
+                  'Salzburg',
+                  'Steiermark',
+                  'Tirol',
+                  'Vorarlberg',
+                  'Wien',
+                  'Österreich',
+                ]
 
 # e.g.: addup EW in shell for BundeslandID=10
 # awk -F";" '{print $4" "$5}' CovidFaelle_Altersgruppe.csv |grep ^10| awk '{x+=$2;} END {print x}'
@@ -111,11 +305,116 @@ def print_dbg(level,msg):
     return
 
 
-def check_age(file_name,age=1):
+def max_rss_mb():
+    """ peak resident memory of the process in MB, None on windows
+    """
+    if resource is None:
+        return None
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on linux
+    if sys.platform == 'darwin':
+        return round(rss / 1024 / 1024, 1)
+    return round(rss / 1024, 1)
+
+
+@contextmanager
+def stage(name):
+    """ record wall time, cpu time and peak memory of a pipeline stage
+
+        the caller can add counts to the yielded dict, e.g. rows or cells.
+        Peak traced memory is only available while tracemalloc is running
+        (--profile). Top level stages are profiled with cProfile then.
+    """
+    st = { 'stage': name, 'level': len(STAGE_STACK) }
+
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        # keep peak of the outer stage before it is reset
+        if STAGE_STACK:
+            parent = STAGE_STACK[-1]
+            parent['_peak'] = max(parent['_peak'], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        st['_peak'] = 0
+
+    prof = None
+    if PROFILE and not STAGE_STACK:
+        import cProfile
+        prof = cProfile.Profile()
+
+    STAGE_STACK.append(st)
+
+    t0 = time.perf_counter()
+    c0 = time.process_time()
+    if prof is not None:
+        prof.enable()
+
+    try:
+        yield st
+    finally:
+        if prof is not None:
+            prof.disable()
+
+        st['wall'] = round(time.perf_counter() - t0, 4)
+        st['cpu']  = round(time.process_time() - c0, 4)
+
+        STAGE_STACK.pop()
+
+        if tracing:
+            peak = max(st.pop('_peak'), tracemalloc.get_traced_memory()[1])
+            st['peak_traced_mb'] = round(peak / 1024 / 1024, 1)
+            if STAGE_STACK:
+                STAGE_STACK[-1]['_peak'] = max(STAGE_STACK[-1]['_peak'], peak)
+        else:
+            st['peak_traced_mb'] = None
+
+        st['max_rss_mb'] = max_rss_mb()
+
+        if prof is not None:
+            dump_profile(name, prof)
+
+        STAGE_STATS.append(st)
+
+        print_dbg(VERBOSE,"stage %s: %.3fs wall, %.3fs cpu" % (name,st['wall'],st['cpu']))
+
+
+def dump_profile(name, prof):
+    """ write cProfile stats and tracemalloc snapshot of a stage
+    """
+    pdir = data_file(PROFILE_DIR)
+    if not os.path.exists(pdir):
+        os.makedirs(pdir)
+
+    fn = pdir + DIR_SEP + name.replace(':', '_').replace(DIR_SEP, '_')
+
+    prof.dump_stats(fn + '.prof')
+    if tracemalloc.is_tracing():
+        tracemalloc.take_snapshot().dump(fn + '.tracemalloc')
+
+    print_dbg(INFO,"profile of %s written to %s.prof" % (name,fn))
+
+
+def write_stats():
+    """ write report of all recorded stages
+    """
+    report = { 'created'   : datetime.now().isoformat(timespec='seconds'),
+               'argv'      : sys.argv[1:],
+               'max_rss_mb': max_rss_mb(),
+               'stages'    : STAGE_STATS,
+             }
+    write_json(data_file(STATS_FILE), report)
+
+    print_dbg(VERBOSE,"stage report written to %s" % data_file(STATS_FILE))
+
+
+def check_age(file_name,age=1,checked=None):
     """ check age of source files
+
+        checked is the time of the last download or 304 of the file, if
+        it is later than the mtime
     """
 
-    file_mod_time = datetime.fromtimestamp(os.stat(file_name).st_mtime)  # This is a datetime.datetime object!
+    file_mod_time = datetime.fromtimestamp(max(os.stat(file_name).st_mtime, checked or 0))  # This is a datetime.datetime object!
     now = datetime.today()
     max_delay = timedelta(days=age)
     file_age = now-file_mod_time
@@ -127,559 +426,2827 @@ def check_age(file_name,age=1):
         return 0
 
 
-def download_files():
-    """ download source files
+def data_file(fn):
+    """ full path of file in data dir
     """
-    # workaround for: ssl.SSLError: [SSL: DH_KEY_TOO_SMALL] dh key too small
-    requests.packages.urllib3.util.ssl_.DEFAULT_CIPHERS += 'HIGH:!DH:!aNULL'
+    return data_home + subdir + DIR_SEP + fn
+
+
+def make_data_dir():
+    """ create data dir
+    """
+    if not os.path.exists(data_home + subdir):
+        os.makedirs(data_home + subdir)
+
+
+def source_url(fn):
+    """ download url of source file
+    """
+    if MIRROR:
+        return MIRROR.rstrip('/') + '/' + fn
+    elif fn == KAZ_BETTEN:
+        return URL_KAZ + fn
+    elif fn == AGES_IMPFUNG:
+        return URL_DATA2 + fn
+    else:
+        return URL_DATA1 + fn
+
+
+def read_json(fn):
+    """ read json file, None if missing or broken
+    """
+    if not os.path.isfile(fn):
+        return None
+
     try:
-        requests.packages.urllib3.contrib.pyopenssl.DEFAULT_SSL_CIPHER_LIST += 'HIGH:!DH:!aNULL'
-    except AttributeError:
-        # no pyopenssl support used / needed / available
-        pass
+        with open(fn, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        print_dbg(INFO,"WARN - '%s' could not be read!" % fn)
+        return None
+
+
+def write_json(fn, data):
+    """ write json file atomically
+    """
+    with open(fn + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(fn + '.tmp', fn)
+
+
+def load_download_meta():
+    """ read ETag/Last-Modified of previous downloads
+    """
+    return read_json(data_file(DOWNLOAD_META)) or {}
+
 
-    for fn in [AGES_FALL,AGES_Einwohner,KAZ_BETTEN, AGES_IMPFUNG]:
+def save_download_meta(meta):
+    """ write ETag/Last-Modified of downloads
+    """
+    write_json(data_file(DOWNLOAD_META), meta)
+
+
+def get_session():
+    """ http session shared by all downloads
+    """
+    import requests
+
+    session = requests.Session()
+    session.headers.update(headers_agent)
+
+    adapter = requests.adapters.HTTPAdapter(pool_connections=DOWNLOAD_WORKERS, pool_maxsize=DOWNLOAD_WORKERS)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    return session
+
+
+def fetch_file(session, fn, url, meta):
+    """ conditional download of one file
+
+        body is streamed to a temp file and then renamed into the data dir.
+        The time of the request is kept as checked, the file is not touched
+        on a 304, so its hash memo stays valid.
+        returns the new meta data and True if the file was downloaded
+    """
+    infile = data_file(fn)
+
+    # validators are only valid for the file we got them with
+    headers = {}
+    if os.path.isfile(infile) and meta.get('size') == os.path.getsize(infile):
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+    print_dbg(INFO,"downloading %s from %s" % (fn,url))
+
+    with session.get(url=url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as r:
+        if r.status_code == 304:
+            # reset age of local file, see stale_files
+            print_dbg(INFO,"%s not modified on server." % fn)
+            return dict(meta, checked=time.time()), False
+
+        r.raise_for_status()
+
+        fd, ftmp = tempfile.mkstemp(prefix=fn + '.', suffix='.part', dir=data_home + subdir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK):
+                    f.write(chunk)
+            os.replace(ftmp, infile)
+        except BaseException:
+            if os.path.exists(ftmp):
+                os.remove(ftmp)
+            raise
+
+        print_dbg(VERBOSE,"%s saved" % fn)
+
+        return { 'url'          : url,
+                 'etag'         : r.headers.get('ETag'),
+                 'last_modified': r.headers.get('Last-Modified'),
+                 'size'         : os.path.getsize(infile),
+                 'checked'      : time.time(),
+               }, True
+
+
+def stale_files():
+    """ source files, that are missing or older than their max. age
+
+        the age counts from the last download or 304 of the file
+    """
+    meta = load_download_meta()
+
+    todo = []
+    for fn in SOURCE_FILES:
         fage = 1
         IS_OLD = False
 
-        infile = data_home + subdir + DIR_SEP + fn
-        if fn == AGES_IMPFUNG:
-            url = URL_DATA2 + fn
-        else:
-            url = URL_DATA1 + fn
+        infile = data_file(fn)
 
         if fn == KAZ_BETTEN:
             fage = 300
-            url = URL_KAZ + fn
 
         if not os.path.isfile(infile):
             IS_OLD = True
             print_dbg(INFO,"missing file %s" % fn)
 
-        if os.path.isfile(infile) and check_age(infile,fage):
+        if os.path.isfile(infile) and check_age(infile,fage,meta.get(fn, {}).get('checked')):
             IS_OLD = True
 
         if IS_OLD:
-            print_dbg(INFO,"downloading %s from %s" % (fn,url))
-            r = requests.get(url=url, headers=headers_agent)
-            with open(infile, 'wb') as f:
-                f.write(r.content)
-
+            todo.append(fn)
         else:
             print_dbg(INFO,"%s is current." % fn)
 
+    return todo
 
 
+def download_files(poll=False):
+    """ download source files
 
-def import_ages_csv2df(fn, csv_sep=';', decsep=',', dateField='Datum'):
-    """ import from csv to dataframe"""
-    csv = ''
+        only files older than their max. age are requested, with poll all
+        files are requested. The request is conditional, so an unchanged
+        file on the server costs only a 304. New versions are added to the
+        archive. returns list of updated files
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    import requests
 
-    csv1 = data_home + fn + '.csv'
-    csv2 = data_home + subdir + DIR_SEP + fn
-    csv3 = fn
+    # workaround for: ssl.SSLError: [SSL: DH_KEY_TOO_SMALL] dh key too small
+    try:
+        requests.packages.urllib3.util.ssl_.DEFAULT_CIPHERS += 'HIGH:!DH:!aNULL'
+    except AttributeError:
+        # urllib3 >= 2 does not use DEFAULT_CIPHERS any more
+        pass
+    try:
+        requests.packages.urllib3.contrib.pyopenssl.DEFAULT_SSL_CIPHER_LIST += 'HIGH:!DH:!aNULL'
+    except AttributeError:
+        # no pyopenssl support used / needed / available
+        pass
 
-    if os.path.isfile(csv1):
-        csv = csv1
-    elif os.path.isfile(csv2):
-        csv = csv2
-    elif os.path.isfile(csv3):
-        csv = csv3
-    else:
-        print_dbg(INFO,"WARN - '%s' could not be read!" % csv)
-        return
+    todo    = SOURCE_FILES if poll else stale_files()
+    updated = []
 
-    print_dbg(INFO,'import csv from %s' % csv)
+    if todo:
+        make_data_dir()
 
-    df = pd.read_csv(csv, sep=csv_sep, encoding='utf-8', decimal=decsep)
+        meta = load_download_meta()
 
-    return df
+        with get_session() as session, ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as pool:
+            jobs = {}
+            for fn in todo:
+                jobs[fn] = pool.submit(fetch_file, session, fn, source_url(fn), meta.get(fn, {}))
 
+            for fn in todo:
+                try:
+                    fmeta, changed = jobs[fn].result()
+                except (requests.RequestException, OSError) as e:
+                    print_dbg(INFO,"WARN - download of %s failed: %s" % (fn,e))
+                    continue
 
-def read_xlsx(xls, year=None):
-    """ read xls file
-    """
-    global source_sheet_name
+                meta[fn] = fmeta
+                if changed:
+                    updated.append(fn)
 
-    print_dbg(VERBOSE,"reading %s" % xls)
-    xlsin = data_home + subdir + DIR_SEP + xls
+        save_download_meta(meta)
 
-    pd_xls       = pd.ExcelFile(xlsin)
-    # number of sheets
-    sn           = len(pd_xls.sheet_names)
-    # sheetname we need
-    source_sheet_name = pd_xls.sheet_names[(int(sn)-1)]
+    # keep every version of the sources
+    if ARCHIVE and os.path.isdir(data_home + subdir):
+        archive_sources()
 
-    print_dbg(VERBOSE,"  sheets       : %s %s" % (sn,pd_xls.sheet_names))
-    print_dbg(VERBOSE,"  reading sheet: %s [%s]" % ((int(sn)-1),source_sheet_name))
+    return updated
 
-    df = pd.read_excel(xlsin, sheet_name = pd_xls.sheet_names[int(sn)-1], header = 3)
 
-    # trim column names
-    #df.rename(columns=lambda x: x.strip(), inplace=True)
 
-    print_dbg(DEBUG,"Column KAZ      : %s" % df.columns)
 
-    return df
+def file_hash(fn):
+    """ sha1 of file content
+    """
+    h = hashlib.sha1()
 
+    with open(fn, 'rb') as f:
+        for block in iter(lambda: f.read(DOWNLOAD_CHUNK), b''):
+            h.update(block)
 
-def set_values(row, value):
-    return value[row]
+    return h.hexdigest()
 
-def run_build():
-    """ build dataframes with all rows
+
+def file_fingerprint(fn, known=None):
+    """ size, mtime and content hash of file
+
+        the hash is reused from known, if size and mtime did not change
     """
+    st = os.stat(fn)
+    fp = { 'size': st.st_size, 'mtime': st.st_mtime_ns }
 
-    # ages files to dataframe
-    df_fa = import_ages_csv2df(AGES_FALL)
-    df_ew = import_ages_csv2df(AGES_Einwohner)
-    df_va = import_ages_csv2df(AGES_IMPFUNG)
+    if known and known.get('size') == fp['size'] and known.get('mtime') == fp['mtime']:
+        fp['hash'] = known['hash']
+    else:
+        fp['hash'] = file_hash(fn)
 
-    print_dbg(DEBUG,"Column FA       : %s" % df_fa.columns)
-    print_dbg(DEBUG,"Column Einwohner: %s" % df_ew.columns)
+    return fp
 
-    # KAZ file to dataframe
-    df_bed = read_xlsx(KAZ_BETTEN);
 
-    print_dbg(DEBUG,"")
-    print_dbg(DEBUG,"-- 0 ----------------------------------")
-    print_dbg(INFO,"processing source data...")
+def cache_path(key, ext=''):
+    """ path of cache entry
+    """
+    return data_file(CACHE_DIR) + DIR_SEP + key + ext
 
-    # sum up all Einwohner
-    df_ew['AnzEinwohner']     = df_ew['AnzEinwohner'].astype(int)
 
-    # get slice of dataframe
-    df_ew_part = df_ew.loc[:,['Time', 'Bundesland', 'AnzEinwohner']]
+def frame_format():
+    """ parquet if pyarrow is available, else pickle
+    """
+    if importlib.util.find_spec('pyarrow') is not None:
+        return '.parquet'
+    return '.pkl'
 
-    print_dbg(DEBUG,"-- df_ew_part: %s" % df_ew_part.head(3))
 
-    key='Time'
-    # 26.02.2020 00:00:00
-    # convert string to datetime
-    print_dbg(DEBUG, "-- to datetime")
-    df_ew_part[key] = pd.to_datetime(df_ew_part[key],format='%d.%m.%Y %H:%M:%S')
-    df_ew_part.set_index(key, inplace=True)
-    df_ew_part      = df_ew_part.sort_index()
+def write_frame(df, fout):
+    """ write dataframe as parquet or pickle, depending on the extension
 
-    time_max = df_ew_part.index.max()
-    print_dbg(DEBUG,"-- time_max: %s" % time_max)
+        other objects than dataframes can be written as pickle
+    """
+    import pandas as pd
 
-    # select only the date from the last date
-    df_ew_max = df_ew_part.loc[time_max]
-    print_dbg(DEBUG,"-- dfx: %s" % df_ew_max.head())
+    try:
+        if fout.endswith('.parquet'):
+            df.to_parquet(fout + '.tmp')
+        else:
+            pd.to_pickle(df, fout + '.tmp')
+        os.replace(fout + '.tmp', fout)
+    except BaseException:
+        if os.path.exists(fout + '.tmp'):
+            os.remove(fout + '.tmp')
+        raise
 
-    for key in BL_Einwohner.keys():
-        x = df_ew_max.loc[df_ew_max['Bundesland'] == key, 'AnzEinwohner'].sum()
-        BL_Einwohner[key] = x
 
+def read_frame(fin):
+    """ read dataframe written by write_frame
+    """
+    import pandas as pd
 
-    # original column header
-    # Index(['Unnamed: 0', 'Österreich', 'BGLD', 'KTN', 'NÖ', 'OÖ', 'SBG', 'STM', 'TIR', 'VLB', 'WIEN'],
-    df_bed.rename(columns={'BGLD': 'Burgenland',
-                           'KTN' : 'Kärnten',
-                           'NÖ'  : 'Niederösterreich',
-                           'OÖ'  : 'Oberösterreich',
-                           'SBG' : 'Salzburg',
-                           'STM' : 'Steiermark',
-                           'TIR' : 'Tirol',
-                           'VLB' : 'Vorarlberg',
-                           'WIEN': 'Wien',
-                           }, inplace=True)
+    if fin.endswith('.parquet'):
+        return pd.read_parquet(fin)
+    return pd.read_pickle(fin)
 
-    print_dbg(DEBUG,"Column Einwohner: %s" % df_bed.columns)
 
-    # get all the ICU beds
-    at_beds = {}
-    for key in BL_Einwohner.keys():
-        x = df_bed[key].values[0]
-        at_beds[key] = x
-        print_dbg(DEBUG,"Val Bed  : %s" % x)
+def cache_entries():
+    """ meta data of all cache entries
+    """
+    cdir = data_file(CACHE_DIR)
+    entries = {}
 
-    print_dbg(DEBUG,"Column Einwohner: %s" % df_bed.head())
-    print_dbg(DEBUG,"-- 1 ----------------------------------")
+    if not os.path.isdir(cdir):
+        return entries
 
-    # prepare data
-    # Meldedat;TestGesamt;MeldeDatum;FZHosp;FZICU;FZHospFree;FZICUFree;BundeslandID;Bundesland
-    # 01.04.2020;0;01.04.2020 00:00:00;7;3;12;3;1;Burgenland
-    key='Meldedat'
-    df_fa[key] = pd.to_datetime(df_fa[key],format='%d.%m.%Y')
-    df_fa.set_index(key, inplace=True)
-    df_fa      = df_fa.sort_index()
-    df_fa.fillna(0, inplace=True)
+    for fn in os.listdir(cdir):
+        if not fn.endswith('.json'):
+            continue
+        entry = read_json(cdir + DIR_SEP + fn)
+        if entry is not None:
+            entries[fn[:-5]] = entry
 
-    # rename value Alle
-    df_fa.loc[df_fa['Bundesland'] == 'Alle', ['Bundesland'] ] = 'Österreich'
+    return entries
 
-    # calc
-    df_fa['TestGesamt']        = df_fa['TestGesamt'].astype(int)
-    df_fa['FZHosp']            = df_fa['FZHosp'].astype(int)
-    df_fa['FZICU']             = df_fa['FZICU'].astype(int)
-    df_fa['FZHospFree']        = df_fa['FZHospFree'].astype(int)
-    df_fa['FZICUFree']         = df_fa['FZICUFree'].astype(int)
 
-    df_fa['Norm. zugewiesen']  = df_fa['FZHosp'] + df_fa['FZHospFree']
-    df_fa['ICU zugewiesen']    = df_fa['FZICU'] + df_fa['FZICUFree']
-    df_fa['Norm. Auslastung']  = (df_fa['FZHosp'] / df_fa['Norm. zugewiesen']).map('{:.6f}'.format)
-    df_fa['ICU Auslastung']    = (df_fa['FZICU'] / df_fa['ICU zugewiesen']).map('{:.6f}'.format)
+def cache_drop(key):
+    """ remove cache entry
+    """
+    for ext in ['.json', '.parquet', '.pkl']:
+        try:
+            os.remove(cache_path(key, ext))
+        except FileNotFoundError:
+            # removed by another process
+            pass
 
-    # add new column
-    df_fa['ICU Betten gesamt']          = df_fa['Bundesland'].apply(set_values, args =(at_beds, ))
-    df_fa['ICU Anteil f. Corona']       = (df_fa['ICU zugewiesen'] / df_fa['ICU Betten gesamt']).map('{:.6f}'.format)
-    df_fa['Einwohner']                  = df_fa['Bundesland'].apply(set_values, args =(BL_Einwohner, ))
-    df_fa['ICU Betten gesamt pro 100T'] = (df_fa['ICU Betten gesamt'] / df_fa['Einwohner'] * 100000).map('{:.1f}'.format)
-    df_fa['v. Intensiv Total']          = (df_fa['FZICU'] / df_fa['ICU Betten gesamt']).map('{:.6f}'.format)
 
-    # set cell type
-    df_fa['ICU Betten gesamt']          = df_fa['ICU Betten gesamt'].astype(int)
+def cache_write_entry(key, entry):
+    """ write meta data of cache entry
+    """
+    write_json(cache_path(key, '.json'), entry)
 
 
-    print_dbg(DEBUG,"Column FA: %s" % df_fa.columns)
-    print_dbg(DEBUG,"Column FA: %s" % df_fa.head(20))
+def cache_load(src, key, inputs=None):
+    """ load cached dataframe of source file src
 
-    print_dbg(DEBUG,"-- 2 -----------------------------------")
+        the entry is valid only for the same inputs, e.g. settings that
+        change the parsed frame. returns (df, extra) or (None, None) if
+        there is no valid entry
+    """
+    if not CACHE or not os.path.isfile(cache_path(key, '.json')):
+        return None, None
 
-    # sheet 1: build columns for sheet 1
-    #                       B            C        D            E                  F                  G       H           I                 J
-    df_fa1 = df_fa.loc[:, ['TestGesamt','FZHosp','FZHospFree','Norm. zugewiesen','Norm. Auslastung','FZICU','FZICUFree','ICU zugewiesen', 'ICU Auslastung',
-        'ICU Anteil f. Corona','ICU Betten gesamt','Bundesland','Einwohner', 'ICU Betten gesamt pro 100T']]
-    #    K                      L                   M
+    entry = cache_entries().get(key)
+    if entry is None:
+        return None, None
 
-    # sheet 2: build columns for sheet 2
-    #                       B            C        D            E                  F                  G       H                    I           J
-    df_fa2 = df_fa.loc[:, ['TestGesamt','FZHosp','FZHospFree','Norm. zugewiesen','Norm. Auslastung','FZICU','v. Intensiv Total', 'FZICUFree','ICU zugewiesen',
-        'ICU Auslastung', 'ICU Anteil f. Corona','ICU Betten gesamt','Bundesland','Einwohner', 'ICU Betten gesamt pro 100T']]
-    #    K                 L                      M                   N            O            P
+    fp = file_fingerprint(src, entry.get('fingerprint'))
 
+    if entry.get('version') != CACHE_VERSION or entry.get('fingerprint', {}).get('hash') != fp['hash'] \
+            or entry.get('inputs') != inputs or not os.path.isfile(cache_path(key, entry['format'])):
+        print_dbg(VERBOSE,"cache for %s is outdated" % os.path.basename(src))
+        cache_drop(key)
+        return None, None
 
-    # Impfungen
-    #date                     ;state_id;state_name;       age_group;gender ;vaccine     ;vaccination; vaccinations_administered_cumulative
-    #2023-04-21T23:59:59+02:00;   0    ; NoState;          00-11   ; Female; AstraZeneca; 1; 2
-    #2023-04-21T23:59:59+02:00;   3    ; Niederösterreich; 00-11   ; Female; AstraZeneca; 1; 7
+    try:
+        df = read_frame(cache_path(key, entry['format']))
+    except Exception as e:
+        print_dbg(INFO,"WARN - cache for %s could not be read: %s" % (os.path.basename(src),e))
+        cache_drop(key)
+        return None, None
 
-    key='Meldedat'
-    df_va[key] = df_va.date.str.extract(pat = '([0-9]+-[0-9]+-[0-9]+)')
-    df_va[key] = pd.to_datetime(df_va[key],format='%Y-%m-%d')
-    df_va.set_index(key, inplace=True)
-    df_va      = df_va.sort_index()
-    df_va.fillna(0, inplace=True)
+    # remember the new mtime, e.g. after a 304 download
+    entry['fingerprint'] = fp
+    entry['used'] = time.time()
+    cache_write_entry(key, entry)
 
-    df_va['state_id']                              = df_va['state_id'].astype(int)
-    df_va['vaccinations_administered_cumulative']  = df_va['vaccinations_administered_cumulative'].astype(int)
+    print_dbg(VERBOSE,"using cached %s" % os.path.basename(src))
 
-    # just a workaround, that I do not have to change so much for the new csv file. Needs to be removed later
-    df_va['vaccinations_administered_cumulativeP'] = df_va['vaccinations_administered_cumulative'].astype(float)
+    return df, entry.get('extra', {})
 
-    print_dbg(INFO," data preparation finished")
 
-    return [ df_fa, df_fa1, df_fa2, df_va ]
+def cache_store(src, key, df, extra=None, fmt=None, inputs=None):
+    """ store dataframe of source file src in cache
 
+        fmt '.pkl' stores any object, inputs are checked by cache_load
+    """
+    if not CACHE:
+        return
 
+    cdir = data_file(CACHE_DIR)
+    if not os.path.exists(cdir):
+        os.makedirs(cdir)
 
-def export_df(df, fn):
-    """ write dataframes to multiple worksheets
+    cache_drop(key)
+
+    fmt  = fmt or frame_format()
+    fout = cache_path(key, fmt)
+    try:
+        write_frame(df, fout)
+    except Exception as e:
+        print_dbg(INFO,"WARN - %s could not be cached: %s" % (os.path.basename(src),e))
+        return
+
+    entry = { 'source'     : os.path.basename(src),
+              'version'    : CACHE_VERSION,
+              'inputs'     : inputs,
+              'fingerprint': file_fingerprint(src),
+              'format'     : fmt,
+              'bytes'      : os.path.getsize(fout),
+              'used'       : time.time(),
+              'extra'      : extra or {},
+            }
+    cache_write_entry(key, entry)
+
+    cache_evict()
+
+
+def cache_evict():
+    """ remove least recently used entries if cache is bigger than CACHE_MAX_MB
     """
+    entries = cache_entries()
+    total   = sum(e.get('bytes', 0) for e in entries.values())
 
-    fout = data_home + subdir + DIR_SEP + fn
+    for key, entry in sorted(entries.items(), key=lambda x: x[1].get('used', 0)):
+        if total <= CACHE_MAX_MB * 1024 * 1024:
+            break
+        print_dbg(VERBOSE,"cache full, removing %s" % key)
+        cache_drop(key)
+        total -= entry.get('bytes', 0)
 
-    print_dbg(INFO,"saving data to %s" % AT_HOSP)
 
-    # create new xls file
-    writer = pd.ExcelWriter(fout, engine='openpyxl', date_format = '%Y-%m-%d')
+def archive_path(*names):
+    """ path in archive dir
+    """
+    return DIR_SEP.join([data_file(ARCHIVE_DIR)] + list(names))
 
-    SN='Intensiv'
-    print_dbg(VERBOSE, " write sheet name %s to file..." % SN)
-    df[1].to_excel(writer, sheet_name= SN, index = True, header = True)
 
-    SN='Total'
-    print_dbg(VERBOSE, " write sheet name %s to file..." % SN)
+def object_path(h, ext=''):
+    """ path of archived object with content hash h
+    """
+    return archive_path(ARCHIVE_OBJECTS, h + ext)
 
-    # last day
-    df[2].tail(10).to_excel(writer, sheet_name= SN, index = True, header = True)
 
-    # all
-    #df[2].to_excel(writer, sheet_name= SN, index = True, header = True)
+def prefix_hash(fn, size):
+    """ sha1 of the first size bytes of file
+    """
+    h = hashlib.sha1()
 
-    SN='Impfungen'
-    print_dbg(VERBOSE, " write sheet name %s to file..." % SN)
-    df[3].to_excel(writer, sheet_name= SN, index = True, header = True)
+    with open(fn, 'rb') as f:
+        while size > 0:
+            block = f.read(min(DOWNLOAD_CHUNK, size))
+            if not block:
+                break
+            h.update(block)
+            size -= len(block)
 
-    writer.save()
+    return h.hexdigest()
 
 
+def archive_store(infile, fp, last):
+    """ store content of infile as object
 
-def format_cells(fn):
-    """ apply format to float fields
-        set background color for some columns
-        set autofilter
-        lock first row
-        set column width
+        if infile only appends to the last version, just the appended bytes
+        are stored and the object refers to the last version as base
     """
+    import gzip
+    import shutil
 
-    fout = data_home + subdir + DIR_SEP + fn
+    odir = archive_path(ARCHIVE_OBJECTS)
+    if not os.path.exists(odir):
+        os.makedirs(odir)
 
-    xl_sheets   = ['Intensiv', 'Total', 'Impfungen']
-    xl_sh_i_pct = [6,10,11]
-    xl_sh_t_pct = [6,8,11,12]
-    # delete or use calculated column
-    xl_sh_v_pct = [10]
+    obj = { 'size': fp['size'], 'base': None, 'offset': 0, 'depth': 0 }
 
-    col_pat_list_i = [ 8,9,10,11,12,13]
-    col_pat_list_t = [ 9,10,11,12,13,14,15,16]
-    # delete or use calculated column
-    col_pat_list_v = [ 10]
+    if last is not None and fp['size'] > last['size']:
+        base = read_json(object_path(last['hash'], '.json'))
+        if base is not None and base['depth'] < ARCHIVE_MAX_DEPTH and prefix_hash(infile, last['size']) == last['hash']:
+            obj.update(base=last['hash'], offset=last['size'], depth=base['depth'] + 1)
 
-    # column colors
-    col_green = 'b3d09a'
-    col_brick = 'ffeadc'
-    col_blue  = 'e1eefa'
-    col_gold  = 'fff4d2'
-    col_lime  = 'e7e0f0'
-    col_gray  = 'f1f1f1'
+    def write(tmp):
+        with open(infile, 'rb') as fin, gzip.open(tmp, 'wb') as fout:
+            fin.seek(obj['offset'])
+            shutil.copyfileobj(fin, fout, DOWNLOAD_CHUNK)
 
-    col_pattern = [ col_green,col_brick,col_blue,col_gold,col_lime, col_gray, col_gray,col_gray,col_gray,]
+    replace_file(object_path(fp['hash'], '.gz'), write)
+    write_json(object_path(fp['hash'], '.json'), obj)
 
-    print_dbg(INFO,"formating data in xlsx")
+    return obj
 
-    xl = openpyxl.load_workbook(fout)
-    print_dbg(VERBOSE," xlsx    : %s" % fn)
-    print_dbg(VERBOSE," sheets  : %s" % xl.sheetnames)
 
-    for sn in xl_sheets:
+def archive_sources():
+    """ add new versions of the source files to the archive
 
-        if sn == 'Intensiv':
-            xl_sh_pct = xl_sh_i_pct
-            col_pat_list = col_pat_list_i
-        elif sn == 'Total':
-            xl_sh_pct = xl_sh_t_pct
-            col_pat_list = col_pat_list_t
+        every distinct content is stored once, the index lists the versions
+        of each file with the time they were fetched. returns list of
+        archived files
+    """
+    index    = read_json(archive_path(ARCHIVE_INDEX)) or {}
+    archived = []
+
+    for fn in SOURCE_FILES:
+        infile = data_file(fn)
+        if not os.path.isfile(infile):
+            continue
+
+        versions = index.setdefault(fn, [])
+        last     = versions[-1] if versions else None
+        fp       = file_fingerprint(infile, last)
 
-        elif sn == 'Impfungen':
-            xl_sh_pct = xl_sh_v_pct
-            col_pat_list = col_pat_list_v
+        if last is not None and last['hash'] == fp['hash']:
+            # same content, keep mtime to skip hashing next time
+            last['mtime'] = fp['mtime']
+            continue
 
-        ws = xl[sn]
+        if not os.path.isfile(object_path(fp['hash'], '.json')):
+            obj = archive_store(infile, fp, last)
+            print_dbg(VERBOSE,"archived %s, %s bytes%s" % (fn,fp['size'] - obj['offset'],' appended' if obj['base'] else ''))
 
-        max_row = ws.max_row
-        max_col = ws.max_column
+        versions.append({ 'fetched': datetime.fromtimestamp(fp['mtime'] / 1e9).isoformat(timespec='seconds'),
+                          'hash'   : fp['hash'],
+                          'size'   : fp['size'],
+                          'mtime'  : fp['mtime'],
+                        })
+        archived.append(fn)
 
-        print_dbg(VERBOSE," ws      : %s" % ws)
-        print_dbg(VERBOSE," max_row : %s" % max_row)
-        print_dbg(VERBOSE," max_col : %s" % max_col)
+    if index:
+        write_json(archive_path(ARCHIVE_INDEX), index)
 
-        # format date column
-        for col in ws.iter_cols(min_row=2, max_col=1, max_row= max_row):
-            for cell in col:
-                cell.number_format = "yyyy-mm-dd"
+    return archived
 
 
-        # format percentage
-        for n in xl_sh_pct:
-            for col in ws.iter_cols(min_row=2, min_col=n,  max_col=n, max_row= max_row):
-                for cell in col:
-                    cell.value = float(cell.value)
-                    cell.number_format = "0.00%"
+def archive_version(fn, day, index):
+    """ last version of fn fetched on or before day (yyyy-mm-dd)
+    """
+    versions = [ v for v in index.get(fn, []) if v['fetched'][:10] <= day ]
+    if not versions:
+        raise ValueError("no version of %s archived on or before %s" % (fn,day))
 
+    return max(versions, key=lambda v: v['fetched'])
 
-        # format float
-        n = max_col
-        for col in ws.iter_cols(min_row=2, min_col=n,  max_col=n, max_row= max_row):
-            for cell in col:
-                cell.value = float(cell.value)
-                cell.number_format = "#,#0.0"
 
+def archive_copy(h, fout):
+    """ write content of object h to open file fout
+    """
+    import gzip
+    import shutil
 
-        i = 0
-        for n in col_pat_list:
-            fill = PatternFill(patternType="solid", start_color= col_pattern[i])
-            i += 1
-            for col in ws.iter_cols(min_row=2, min_col=n,  max_col=n, max_row= max_row):
-                for cell in col:
-                    cell.fill = fill
+    obj = read_json(object_path(h, '.json'))
+    if obj is None:
+        raise ValueError("archived object %s is missing" % h)
 
+    if obj['base'] is not None:
+        archive_copy(obj['base'], fout)
 
-        # set filter
-        ws.auto_filter.ref = ws.dimensions
-        ws.freeze_panes = 'A2'
+    with gzip.open(object_path(h, '.gz'), 'rb') as fin:
+        shutil.copyfileobj(fin, fout, DOWNLOAD_CHUNK)
 
-        # set cell width
-        # https://stackoverflow.com/questions/13197574/openpyxl-adjust-column-width-size
-        # ------------------------------------------------
-        dim_holder = DimensionHolder(worksheet=ws)
 
-        # getting header names to calc length.
-        # I guess, not needed any more
-        rows = ws.iter_rows(min_row=1, max_row=1)
-        first_row = next(rows)
-        headings = [c.value for c in first_row]
+def archive_restore(day):
+    """ restore the sources as they were on day into data/archive/asof/day
 
-        for col in range(ws.min_column, ws.max_column + 1):
-            new_column_length = 17
-            # get length of longest column value
-            for cv in ws.iter_cols(min_row=1, min_col=col,  max_col=col, max_row= max_row):
-              new_column_length = max(len(str(cell.value)) for cell in cv)
+        returns the dir with the restored files
+    """
+    index = read_json(archive_path(ARCHIVE_INDEX)) or {}
+    adir  = archive_path('asof', day)
+    if not os.path.exists(adir):
+        os.makedirs(adir)
 
-            dim_holder[get_column_letter(col)] = ColumnDimension(ws, min=col, max=col, width=new_column_length*1.25)
+    for fn in SOURCE_FILES:
+        version = archive_version(fn, day, index)
+        fout    = adir + DIR_SEP + fn
 
-        ws.column_dimensions = dim_holder
+        if os.path.isfile(fout) and os.path.getsize(fout) == version['size'] and file_hash(fout) == version['hash']:
+            continue
 
+        print_dbg(INFO,"restoring %s of %s" % (fn,version['fetched']))
 
+        def write(tmp):
+            with open(tmp, 'wb') as f:
+                archive_copy(version['hash'], f)
 
-    # ------------------------------------------------
-    xl.save(fout)
+        replace_file(fout, write)
 
-    return
+    return adir
 
 
-def copy_sheet_to_result(src_file,tgt_file):
-    """ copy sheet from KAZ file to result file
+def find_csv(fn):
+    """ path of csv file
     """
+    csv1 = data_home + fn + '.csv'
+    csv2 = data_home + subdir + DIR_SEP + fn
+    csv3 = fn
 
-    # copy sheet 2019 to BettenFachrichtung
-    fsrc = data_home + subdir + DIR_SEP + src_file
-    xl_src = openpyxl.load_workbook(fsrc)
+    if os.path.isfile(csv1):
+        return csv1
+    elif os.path.isfile(csv2):
+        return csv2
+    elif os.path.isfile(csv3):
+        return csv3
 
-    ftgt = data_home + subdir + DIR_SEP + tgt_file
-    xl_tgt = openpyxl.load_workbook(ftgt)
+    return None
 
-    return
 
+def import_ages_csv2df(fn, csv_sep=';', decsep=',', dateField='Datum', schema=None):
+    """ import from csv to dataframe
 
-'''
-   Check whether the file exist or not.
-   file_path : the input file path with name.
-   Return True if the file exist otherwise return False.
-   https://www.dev2qa.com/how-to-use-python-openpyxl-to-copy-excel-sheet-data-in-same-and-different-excel-file
-'''
-def if_file_exist(file_path):
-     if os.path.exists(file_path):
-         return True
-     else:
-         return False
+        schema of CSV_SCHEMAS selects and types the columns
+    """
+    import pandas as pd
 
-'''
-   Check whether the excel file contain the excel sheet.
-   work_book : openpyxl.Workbook instance.
-   work_sheet_name : excel sheet name.
-   Return True if the excel file contain the excel sheet otherwise return False.
-   https://www.dev2qa.com/how-to-use-python-openpyxl-to-copy-excel-sheet-data-in-same-and-different-excel-file
-'''
-def if_excel_sheet_exist(work_book, work_sheet_name):
-    HAS_SHEET = False
+    csv = find_csv(fn)
+
+    if csv is None:
+        print_dbg(INFO,"WARN - '%s' could not be read!" % fn)
+        return
 
-    sheet_names_list = work_book.sheetnames
-    for sheet_name in sheet_names_list:
-        if sheet_name == work_sheet_name:
-            HAS_SHEET = True
+    schema = schema or {}
+    engine = csv_engine()
 
-    return HAS_SHEET
+    print_dbg(INFO,'import csv from %s' % csv)
 
+    if engine == 'pyarrow':
+        import pyarrow.csv as pcsv
 
-'''
-   Copy excel sheet data from one excel file to another excel file.
-   source_file_path : source excel file path with name.
-   source_sheet_name : source excel sheet name.
-   target_file_path : target excel file path with name.
+        table = pcsv.read_csv(csv, *arrow_options(schema, csv_sep, decsep))
+        return arrow_frame(table)
 
-   https://www.dev2qa.com/how-to-use-python-openpyxl-to-copy-excel-sheet-data-in-same-and-different-excel-file
-'''
-def copy_excel_sheet_in_different_file(source_file_path, source_sheet_name, target_file_path, target_sheet_name):
-    target_work_sheet = None
+    df = pd.read_csv(csv, sep=csv_sep, encoding='utf-8', decimal=decsep,
+                     usecols=schema.get('usecols'), dtype=schema.get('dtype'))
+
+    return df
 
-    # if target excel file exist then load it.
-    if if_file_exist(target_file_path):
-        target_work_book = load_workbook(target_file_path)
-    else:
-        print_dbg(ERROR,"File %s do not exist." % target_file_path,)
-        return 1
 
+def csv_engine():
+    """ parser of CSV_ENGINE, 'auto' is pyarrow if it is installed
+    """
+    if CSV_ENGINE == 'auto':
+        return 'pyarrow' if importlib.util.find_spec('pyarrow') is not None else 'c'
 
-    if if_file_exist(source_file_path):
-        # load Workbook object source excel file.
-        source_work_book = load_workbook(source_file_path)
+    return CSV_ENGINE
 
-        if if_excel_sheet_exist(source_work_book, source_sheet_name):
 
-            print_dbg(DEBUG,"Source excel sheet %s exist." % source_sheet_name)
+def arrow_type(dtype):
+    """ arrow type of a pandas dtype name in CSV_SCHEMAS
+    """
+    import pyarrow as pa
 
-            # get source Worksheet object.
-            source_work_sheet = source_work_book[source_sheet_name]
+    if dtype == 'category':
+        return pa.dictionary(pa.int32(), pa.string())
 
+    # nullable Int16 etc. are int16 in arrow
+    return pa.type_for_alias(dtype.lower())
 
-            # if target excel sheet exist in target excel file the return it.
-            if if_excel_sheet_exist(target_work_book, target_sheet_name):
-                print_dbg(VERBOSE,"sheet %s already exists" % target_sheet_name)
-                #target_work_sheet = target_work_book[target_sheet_name]
 
-            # otherwise create a new Worksheet object. 
-            else:
-                print_dbg(VERBOSE,"create new worksheet %s" % target_sheet_name)
-                target_work_sheet = target_work_book.create_sheet(target_sheet_name)
+def arrow_options(schema, csv_sep=';', decsep=',', block_size=None):
+    """ read, parse and convert options of pyarrow.csv for a schema of CSV_SCHEMAS
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pcsv
 
+    if ARROW_THREADS:
+        pa.set_cpu_count(ARROW_THREADS)
 
-                # loop in the source excel sheet rows.    
-                row_number = 1
-                for row in source_work_sheet.iter_rows():
+    read = pcsv.ReadOptions(use_threads=True)
+    if block_size:
+        read.block_size = block_size
 
-                    # loop in the row cells.
-                    cell_column_number = 1
-                    for cell in row:
+    # dates are parsed by parse_dates, empty fields are missing like in pandas
+    convert = pcsv.ConvertOptions(decimal_point=decsep,
+                                  include_columns=schema.get('usecols') or [],
+                                  column_types={ col: arrow_type(t) for col, t in schema.get('dtype', {}).items() },
+                                  strings_can_be_null=True,
+                                  timestamp_parsers=[])
 
-                        # create a target excel cell in target excel sheet.
-                        target_cell = target_work_sheet.cell(row = row_number, column = cell_column_number, value = cell.value)
-                        if cell.has_style:
-                            #target_cell._style = copy(cell._style)
+    return read, pcsv.ParseOptions(delimiter=csv_sep), convert
 
-                            target_cell.font = copy(cell.font)
-                            target_cell.border = copy(cell.border)
-                            target_cell.fill = copy(cell.fill)
-                            target_cell.number_format = copy(cell.number_format)
-                            target_cell.protection = copy(cell.protection)
-                            target_cell.alignment = copy(cell.alignment)
 
-                        cell_column_number += 1
+def arrow_frame(table):
+    """ dataframe of an arrow table, see CSV_ARROW_DTYPES
+    """
+    import pandas as pd
+    import pyarrow as pa
 
-                    row_number += 1
+    if not CSV_ARROW_DTYPES:
+        return table.to_pandas()
 
-                # set cell width
-                # https://stackoverflow.com/questions/13197574/openpyxl-adjust-column-width-size
-                # ------------------------------------------------
-                ws = target_work_sheet
-                dim_holder = DimensionHolder(worksheet=ws)
+    # dictionaries become categorical, the other columns keep their arrow type
+    return table.to_pandas(types_mapper=lambda t: None if pa.types.is_dictionary(t) else pd.ArrowDtype(t))
 
-                for col in range(ws.min_column, ws.max_column + 1):
-                    dim_holder[get_column_letter(col)] = ColumnDimension(ws, min=col, max=col, width=20)
 
-                ws.column_dimensions = dim_holder
+def csv_chunks(csv, rows, schema=None):
+    """ dataframes of about rows rows of csv
+    """
+    import pandas as pd
 
-                # save the target excel file.
-                target_work_book.save(target_file_path)
+    schema = schema or {}
 
-                print_dbg(DEBUG,"Excel sheet has be copied. ")
-        else:
-            print_dbg(DEBUG,"Source excel sheet %s do not  exist." % source_sheet_name)
+    if csv_engine() == 'pyarrow':
+        import pyarrow as pa
+        import pyarrow.csv as pcsv
 
-    else:
-        print_dbg(DEBUG,"File %s do not exist." % source_file_path,)
+        # block of rows rows, the streaming reader splits at line ends
+        block_size = min(rows * line_bytes(csv), 1 << 30)
 
+        with pcsv.open_csv(csv, *arrow_options(schema, block_size=block_size)) as reader:
+            for batch in reader:
+                yield arrow_frame(pa.Table.from_batches([batch]))
+        return
 
-# --------------------------------------------------------------------
+    with pd.read_csv(csv, sep=';', encoding='utf-8', decimal=',', usecols=schema.get('usecols'), dtype=schema.get('dtype'),
+                     chunksize=rows) as reader:
+        for chunk in reader:
+            yield chunk
 
-if __name__ == "__main__":
 
-    print_dbg(INFO,"creating excel file from AGES and KAZ data")
+def parse_dates(col, layout, with_time=False):
+    """ parse date column with a layout of DATE_LAYOUTS
+
+        every distinct string is parsed only once and the result is
+        broadcast to all rows. The time is taken from position 11-19.
+    """
+    import pandas as pd
+
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        codes   = col.cat.codes.values
+        uniques = pd.Series(col.cat.categories, dtype=object)
+    else:
+        codes, uniques = pd.factorize(col)
+        uniques = pd.Series(uniques, dtype=object)
 
-    # download source date if necessary
-    download_files()
+    uniques = uniques.astype(str)
+    (y0,y1), (m0,m1), (d0,d1) = DATE_LAYOUTS[layout]
 
-    df = run_build()
-    export_df(df,AT_HOSP)
+    iso = uniques.str[y0:y1] + '-' + uniques.str[m0:m1] + '-' + uniques.str[d0:d1]
+    fmt = '%Y-%m-%d'
+    if with_time:
+        iso = iso + ' ' + uniques.str[11:19]
+        fmt = fmt + ' %H:%M:%S'
 
-    source_file_path = data_home + subdir + DIR_SEP + KAZ_BETTEN
-    target_file_path = data_home + subdir + DIR_SEP + AT_HOSP
-    target_sheet_name = 'BettenFachrichtung'
-    copy_excel_sheet_in_different_file(source_file_path, source_sheet_name, target_file_path, target_sheet_name)
+    days   = pd.to_datetime(iso, format=fmt).values
+    values = days.take(codes)
+    # missing value
+    values[codes < 0] = None
+
+    return pd.Series(values, index=col.index, name=col.name)
+
+
+def report_dates(raw, fn):
+    """ report date of the rows of a raw source frame
+    """
+    if fn == AGES_IMPFUNG:
+        return parse_dates(raw['date'], 'iso')
+
+    return parse_dates(raw['Meldedat'], 'dmy')
+
+
+def date_window():
+    """ first and last report date of the window, None if open
+
+        the last WINDOW_LAST days end with WINDOW_UNTIL or today, both
+        ends are included
+    """
+    import pandas as pd
+
+    since = pd.Timestamp(WINDOW_SINCE) if WINDOW_SINCE else None
+    until = pd.Timestamp(WINDOW_UNTIL) if WINDOW_UNTIL else None
+
+    if WINDOW_LAST:
+        last  = (until if until is not None else pd.Timestamp(date.today())) - pd.Timedelta(days=int(WINDOW_LAST) - 1)
+        since = last if since is None else max(since, last)
+
+    return since, until
+
+
+def windowed():
+    """ True if the build is limited to a date window
+    """
+    return bool(WINDOW_SINCE or WINDOW_UNTIL or WINDOW_LAST)
+
+
+def line_bytes(csv):
+    """ average bytes per line of the first 64 kB of csv
+    """
+    with open(csv, 'rb') as f:
+        head = f.read(65536)
+
+    return max(1, len(head) // max(head.count(b'\n'), 1))
+
+
+def chunk_rows(csv, budget_mb=None):
+    """ number of csv rows per chunk, whose parse buffer fits into budget_mb
+
+        estimated from the raw bytes per line, see CSV_PARSE_FACTOR.
+        budget_mb defaults to VA_MEM_BUDGET_MB
+    """
+    budget_mb = budget_mb or VA_MEM_BUDGET_MB
+
+    return max(1000, int(budget_mb * 1024 * 1024 / (line_bytes(csv) * CSV_PARSE_FACTOR)))
+
+
+def concat_frames(parts):
+    """ concat chunks and keep categorical columns categorical
+    """
+    import pandas as pd
+
+    if not parts:
+        return None
+
+    for col in parts[0].columns:
+        if not isinstance(parts[0][col].dtype, pd.CategoricalDtype):
+            continue
+
+        # chunks have different categories, unite them
+        cats = pd.Index([])
+        for df in parts:
+            cats = cats.append(df[col].cat.categories.difference(cats))
+        dtype = pd.CategoricalDtype(cats)
+
+        for df in parts:
+            df[col] = df[col].astype(dtype)
+
+    return pd.concat(parts)
+
+
+def import_csv_chunked(csv, prepare, schema=None, budget_mb=None, fn=None, since=None, finish=None, window=None):
+    """ import csv in chunks, the parse buffer of a chunk is bounded by budget_mb
+
+        schema of CSV_SCHEMAS selects and types the columns. Every chunk
+        is prepared, rows with a report date not after since are skipped.
+        Rows outside window (first, last) are dropped before they are
+        prepared. finish is applied to the joined chunks.
+        budget_mb defaults to VA_MEM_BUDGET_MB. The prepared chunks are
+        kept until they are joined, they take about as much memory as the
+        result, e.g. little with VA_AGGREGATE.
+        returns dataframe and stats (rows read, rows skipped, rows outside
+        the window, last date)
+    """
+    rows  = chunk_rows(csv, budget_mb)
+    parts = []
+    stats = { 'rows': 0, 'skipped': 0, 'outside': 0, 'last': None }
+
+    print_dbg(INFO,'import csv from %s in chunks of %s rows' % (csv,rows))
+
+    for chunk in csv_chunks(csv, rows, schema):
+        stats['rows'] += len(chunk)
+
+        if fn is not None:
+            dates = report_dates(chunk, fn)
+            if len(chunk) and (stats['last'] is None or dates.max() > stats['last']):
+                stats['last'] = dates.max()
+
+            if window is not None:
+                first, last = window
+                keep = dates.notna()
+                if first is not None:
+                    keep &= dates >= first
+                if last is not None:
+                    keep &= dates <= last
+                keep = keep.values
+                stats['outside'] += len(chunk) - keep.sum()
+                chunk = chunk.loc[keep]
+                dates = dates.loc[keep]
+
+            if since is not None:
+                is_new = (dates > since).values
+                stats['skipped'] += len(chunk) - is_new.sum()
+                chunk = chunk.loc[is_new]
+
+        if len(chunk):
+            parts.append(prepare(chunk))
+
+    df = concat_frames(parts)
+
+    if df is not None:
+        if not df.index.is_monotonic_increasing:
+            df.sort_index(kind='stable', inplace=True)
+        if finish is not None:
+            df = finish(df)
+
+    return df, stats
+
+
+def import_cached(fn, prepare, reader=None, inputs=None):
+    """ import csv and prepare dataframe, use cache if source is unchanged
+
+        reader(csv) replaces import and prepare, e.g. for a chunked import.
+        inputs are the settings used by prepare, see cache_load
+    """
+    csv = find_csv(fn)
+
+    if csv is None:
+        print_dbg(INFO,"WARN - '%s' could not be read!" % fn)
+        return
+
+    df, extra = cache_load(csv, fn, inputs)
+    if df is None:
+        if reader is not None:
+            df = reader(csv)
+        else:
+            df = prepare(import_ages_csv2df(csv, schema=CSV_SCHEMAS.get(fn)))
+        cache_store(csv, fn, df, inputs=inputs)
+
+    return df
+
+
+def import_windowed(fn, prepare, finish=None, pad=0):
+    """ import the rows of date_window() and pad days before it
+
+        the padding is needed by rolling windows, cache and state are not used
+    """
+    import pandas as pd
+
+    csv = find_csv(fn)
+
+    if csv is None:
+        print_dbg(INFO,"WARN - '%s' could not be read!" % fn)
+        return
+
+    first, last = date_window()
+    if first is not None and pad:
+        first = first - pd.Timedelta(days=pad)
+
+    df, stats = import_csv_chunked(csv, prepare, CSV_SCHEMAS.get(fn), fn=fn, finish=finish, window=(first, last))
+
+    print_dbg(VERBOSE,"%s: %s of %s rows between %s and %s"
+              % (fn,stats['rows'] - stats['outside'],stats['rows'],first or '-',last or '-'))
+
+    if df is None:
+        raise ValueError("%s has no rows between %s and %s" % (fn,first or '-',last or '-'))
+
+    return df
+
+
+def prepare_fallzahlen(df_fa):
+    """ convert types of AGES_FALL
+    """
+    # prepare data
+    # Meldedat;TestGesamt;MeldeDatum;FZHosp;FZICU;FZHospFree;FZICUFree;BundeslandID;Bundesland
+    # 01.04.2020;0;01.04.2020 00:00:00;7;3;12;3;1;Burgenland
+    key='Meldedat'
+    df_fa[key] = parse_dates(df_fa[key], 'dmy')
+    df_fa.set_index(key, inplace=True)
+    df_fa      = df_fa.sort_index()
+    df_fa.fillna(0, inplace=True)
+
+    # rename value Alle
+    df_fa.loc[df_fa['Bundesland'] == 'Alle', ['Bundesland'] ] = 'Österreich'
+
+    df_fa['TestGesamt']        = df_fa['TestGesamt'].astype(int)
+    df_fa['FZHosp']            = df_fa['FZHosp'].astype(int)
+    df_fa['FZICU']             = df_fa['FZICU'].astype(int)
+    df_fa['FZHospFree']        = df_fa['FZHospFree'].astype(int)
+    df_fa['FZICUFree']         = df_fa['FZICUFree'].astype(int)
+
+    return df_fa
+
+
+def population_index(fn):
+    """ population per Bundesland of the latest snapshot of AGES_Einwohner
+
+        only Time, Bundesland and AnzEinwohner are read and summed up with
+        one groupby. The result is cached with the fingerprint of the csv,
+        returns dict
+    """
+    import pandas as pd
+
+    csv = find_csv(fn)
+
+    if csv is None:
+        print_dbg(INFO,"WARN - '%s' could not be read!" % fn)
+        return
+
+    einwohner, extra = cache_load(csv, fn)
+    if einwohner is not None:
+        return einwohner
+
+    # Time;Altersgruppe;Bundesland;BundeslandID;AnzEinwohner;...
+    # 26.02.2020 00:00:00;<5;Burgenland;1;14380;...
+    df_ew = import_ages_csv2df(csv, schema=CSV_SCHEMAS[fn])
+
+    times  = parse_dates(df_ew['Time'], 'dmy', with_time=True)
+    latest = df_ew.loc[(times == times.max()).values]
+    print_dbg(DEBUG,"-- time_max: %s" % times.max())
+
+    sums = latest.groupby('Bundesland', observed=True)['AnzEinwohner'].sum()
+    einwohner = { key: int(sums.get(key, 0)) for key in BUNDESLAENDER }
+
+    cache_store(csv, fn, einwohner, fmt='.pkl')
+
+    return einwohner
+
+
+def prepare_impfungen(df_va):
+    """ convert types of a chunk of AGES_IMPFUNG
+    """
+    # Impfungen
+    #date                     ;state_id;state_name;       age_group;gender ;vaccine     ;vaccination; vaccinations_administered_cumulative
+    #2023-04-21T23:59:59+02:00;   0    ; NoState;          00-11   ; Female; AstraZeneca; 1; 2
+    #2023-04-21T23:59:59+02:00;   3    ; Niederösterreich; 00-11   ; Female; AstraZeneca; 1; 7
+
+    key='Meldedat'
+    df_va[key] = report_dates(df_va, AGES_IMPFUNG)
+    df_va.set_index(key, inplace=True)
+
+    df_va['state_id']                              = df_va['state_id'].fillna(0).astype('int16')
+    df_va['vaccination']                           = df_va['vaccination'].fillna(0).astype('int8')
+    df_va['vaccinations_administered_cumulative']  = df_va['vaccinations_administered_cumulative'].fillna(0).astype('int64')
+
+    df_va = aggregate_impfungen(df_va)
+
+    # just a workaround, that I do not have to change so much for the new csv file. Needs to be removed later
+    df_va['vaccinations_administered_cumulativeP'] = df_va['vaccinations_administered_cumulative'].astype(float)
+
+    return df_va
+
+
+def aggregate_impfungen(df_va, columns=None):
+    """ sum up vaccinations per date and columns, default VA_AGGREGATE
+    """
+    columns = columns or VA_AGGREGATE
+    if columns is None:
+        return df_va
+
+    key = 'vaccinations_administered_cumulative'
+    df_va = df_va.groupby(['Meldedat'] + columns, observed=True, sort=True)[key].sum().reset_index(columns)
+
+    df_va['vaccinations_administered_cumulativeP'] = df_va[key].astype(float)
+
+    return df_va
+
+
+def import_impfungen(csv):
+    """ chunked import of AGES_IMPFUNG with compact column types
+    """
+    df_va, stats = import_csv_chunked(csv, prepare_impfungen, CSV_SCHEMAS[AGES_IMPFUNG], finish=aggregate_impfungen)
+
+    return df_va
+
+
+def load_kaz(xls):
+    """ read last sheet of KAZ workbook
+
+        the workbook is opened only once per process and the result is
+        cached as long as the file does not change. returns dict with
+          df        : bed counts
+          sheet_name: name of the sheet
+          sheet     : model of the sheet to copy it with its styles
+    """
+    xlsin = data_file(xls)
+
+    if not if_file_exist(xlsin):
+        print_dbg(ERROR,"File %s do not exist." % xlsin)
+        return None
+
+    key = kaz_key(xlsin)
+    if key in KAZ_LOADED:
+        return KAZ_LOADED[key]
+
+    kaz, extra = cache_load(xlsin, xls)
+    if kaz is None:
+        kaz = parse_kaz(xlsin)
+        cache_store(xlsin, xls, kaz, fmt='.pkl')
+
+    KAZ_LOADED.clear()
+    KAZ_LOADED[key] = kaz
+
+    return kaz
+
+
+def kaz_key(xlsin):
+    """ key of KAZ workbook in KAZ_LOADED
+    """
+    st = os.stat(xlsin)
+    return (xlsin, st.st_size, st.st_mtime_ns)
+
+
+def parse_kaz(xlsin):
+    """ parse KAZ workbook into bed frame and sheet model
+    """
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    print_dbg(VERBOSE,"reading %s" % xlsin)
+
+    wb = load_workbook(xlsin, read_only=True)
+
+    # number of sheets
+    sn = len(wb.sheetnames)
+    # sheetname we need
+    sheet_name = wb.sheetnames[sn - 1]
+
+    print_dbg(VERBOSE,"  sheets       : %s %s" % (sn,wb.sheetnames))
+    print_dbg(VERBOSE,"  reading sheet: %s [%s]" % ((sn - 1),sheet_name))
+
+    ws = wb[sheet_name]
+    # the dimension stored in the file can be too small, read_excel resets it too
+    ws.reset_dimensions()
+
+    # every distinct style is kept only once
+    style_ids = {}
+    styles    = []
+    rows      = []
+
+    for row in ws.iter_rows():
+        cells = []
+        for cell in row:
+            sid = None
+            if getattr(cell, 'has_style', False):
+                skey = tuple(cell.style_array)
+                if skey not in style_ids:
+                    style_ids[skey] = len(styles)
+                    styles.append({ 'font'         : copy(cell.font),
+                                    'border'       : copy(cell.border),
+                                    'fill'         : copy(cell.fill),
+                                    'number_format': cell.number_format,
+                                    'protection'   : copy(cell.protection),
+                                    'alignment'    : copy(cell.alignment),
+                                  })
+                sid = style_ids[skey]
+            cells.append((cell.value, sid))
+        rows.append(cells)
+
+    wb.close()
+
+    # the copy keeps the formulas, the bed frame gets the values computed
+    # by Excel like read_excel
+    wb = load_workbook(xlsin, read_only=True, data_only=True)
+    ws = wb[sheet_name]
+    ws.reset_dimensions()
+    values = [ list(r) for r in ws.iter_rows(values_only=True) ]
+    wb.close()
+
+    sheet = { 'title'     : sheet_name,
+              'min_column': 1,
+              'max_column': max([len(r) for r in rows] + [1]),
+              'styles'    : styles,
+              'rows'      : rows,
+            }
+
+    # bed frame, header in 4th row like read_excel(header=3)
+    header = [ v if v is not None else 'Unnamed: %d' % i for i, v in enumerate(values[3]) ] if len(values) > 3 else []
+    data   = [ r + [None] * (len(header) - len(r)) for r in values[4:] ]
+    data   = [ r[:len(header)] for r in data if any(v is not None for v in r) ]
+
+    df = pd.DataFrame(data, columns=header).infer_objects()
+
+    # trim column names
+    #df.rename(columns=lambda x: x.strip(), inplace=True)
+
+    print_dbg(DEBUG,"Column KAZ      : %s" % df.columns)
+
+    return { 'df': df, 'sheet_name': sheet_name, 'sheet': sheet }
+
+
+def read_xlsx(xls, year=None):
+    """ read xls file, name of the sheet is in load_kaz(xls)['sheet_name']
+    """
+    kaz = load_kaz(xls)
+
+    return kaz['df'].copy()
+
+
+def state_path(name, ext=''):
+    """ path of state file of incremental build
+    """
+    return data_file(STATE_DIR) + DIR_SEP + name + ext
+
+
+def state_load(name):
+    """ load frame and info of last incremental build
+
+        returns (df, info) or (None, None)
+    """
+    info = read_json(state_path(name, '.json'))
+    if info is None:
+        return None, None
+
+    try:
+        df = read_frame(state_path(name, info['format']))
+    except Exception as e:
+        print_dbg(INFO,"WARN - state of %s could not be read: %s" % (name,e))
+        return None, None
+
+    return df, info
+
+
+def state_store(name, df, info):
+    """ store frame and info of incremental build
+    """
+    sdir = data_file(STATE_DIR)
+    if not os.path.exists(sdir):
+        os.makedirs(sdir)
+
+    info['format'] = frame_format()
+    write_frame(df, state_path(name, info['format']))
+    write_json(state_path(name, '.json'), info)
+
+
+def import_incremental(fn, prepare, derive=None, inputs=None, schema=None, budget_mb=None, finish=None, history=0):
+    """ import csv and process only rows after the last processed Meldedat
+
+        prepared and derived rows are kept in data/state and the new rows
+        are appended. A full rebuild is done, if the inputs changed, the
+        bytes read last time changed (values corrected in place) or the
+        number of older rows differs (revised history).
+        derive(df, prev) gets the kept rows of the last history days as
+        prev, e.g. for rolling windows
+    """
+    import pandas as pd
+
+    csv = find_csv(fn)
+
+    if csv is None:
+        print_dbg(INFO,"WARN - '%s' could not be read!" % fn)
+        return
+
+    df_old, info = state_load(fn)
+
+    if df_old is not None and (info.get('version') != CACHE_VERSION or info.get('inputs') != inputs):
+        print_dbg(VERBOSE,"state of %s is outdated, full rebuild" % fn)
+        df_old = None
+
+    # size and hash of the bytes read by this import
+    fp = file_fingerprint(csv, info.get('fingerprint') if df_old is not None else None)
+
+    if df_old is not None:
+        if fp['hash'] == info['fingerprint']['hash']:
+            print_dbg(VERBOSE,"%s unchanged since %s" % (fn,info['last']))
+            return df_old
+
+        # only appended rows are processed, the bytes read last time must be the same
+        size = info['fingerprint']['size']
+        if fp['size'] < size or prefix_hash(csv, size) != info['fingerprint']['hash']:
+            print_dbg(VERBOSE,"history of %s changed, full rebuild" % fn)
+            df_old = None
+
+    since = None
+    if df_old is not None:
+        since = pd.Timestamp(info['last'])
+
+    df, stats = import_csv_chunked(csv, prepare, schema, budget_mb, fn, since, finish)
+
+    if df_old is not None and stats['skipped'] != info['rows']:
+        print_dbg(VERBOSE,"history of %s changed, full rebuild" % fn)
+        df_old = None
+        df, stats = import_csv_chunked(csv, prepare, schema, budget_mb, fn, None, finish)
+
+    if df is not None and derive is not None:
+        prev = None
+        if df_old is not None and history:
+            prev = df_old.loc[df_old.index > since - pd.Timedelta(days=history)]
+        df = derive(df, prev)
+
+    if df_old is not None:
+        print_dbg(VERBOSE,"%s: %s new rows after %s" % (fn,stats['rows'] - stats['skipped'],info['last']))
+        if df is not None:
+            df = concat_frames([df_old, df])
+        else:
+            df = df_old
+
+    info = { 'version'    : CACHE_VERSION,
+             'inputs'     : inputs,
+             'fingerprint': fp,
+             'last'       : stats['last'].strftime('%Y-%m-%d'),
+             'rows'       : stats['rows'],
+           }
+    state_store(fn, df, info)
+
+    return df
+
+
+def derive_fallzahlen(df_fa, at_beds, einwohner, prev=None):
+    """ add calculated columns to AGES_FALL
+
+        ratios stay float, the display precision is set by the number
+        formats of the sheets. prev are derived rows of the days before
+        df_fa for the rolling windows
+    """
+    # calc
+    df_fa['Norm. zugewiesen']  = df_fa['FZHosp'] + df_fa['FZHospFree']
+    df_fa['ICU zugewiesen']    = df_fa['FZICU'] + df_fa['FZICUFree']
+    df_fa['Norm. Auslastung']  = df_fa['FZHosp'] / df_fa['Norm. zugewiesen']
+    df_fa['ICU Auslastung']    = df_fa['FZICU'] / df_fa['ICU zugewiesen']
+
+    # add new column
+    df_fa['ICU Betten gesamt']          = df_fa['Bundesland'].map(at_beds)
+    df_fa['ICU Anteil f. Corona']       = df_fa['ICU zugewiesen'] / df_fa['ICU Betten gesamt']
+    df_fa['Einwohner']                  = df_fa['Bundesland'].map(einwohner)
+    df_fa['ICU Betten gesamt pro 100T'] = df_fa['ICU Betten gesamt'] / df_fa['Einwohner'] * 100000
+    df_fa['v. Intensiv Total']          = df_fa['FZICU'] / df_fa['ICU Betten gesamt']
+
+    # set cell type
+    df_fa['ICU Betten gesamt']          = df_fa['ICU Betten gesamt'].astype(int)
+    df_fa['Einwohner']                  = df_fa['Einwohner'].astype(int)
+
+    df_fa['Hospitalisiert pro 100T']    = (df_fa['FZHosp'] + df_fa['FZICU']) / df_fa['Einwohner'] * 100000
+
+    return derive_trends(df_fa, prev)
+
+
+def derive_trends(df_fa, prev=None):
+    """ rolling means over TREND_WINDOWS days and change against the day
+        before of FZHosp and FZICU per Bundesland
+
+        the windows of the first days of df_fa are filled with prev, so an
+        incremental build needs only the last days of the kept rows
+    """
+    import pandas as pd
+
+    cols = ['Bundesland', 'FZHosp', 'FZICU']
+    base = df_fa[cols]
+    if prev is not None and len(prev):
+        base = pd.concat([prev[cols], base])
+    skip = len(base) - len(df_fa)
+
+    grouped = base.groupby('Bundesland', observed=True, sort=False)
+
+    for key in ['FZHosp', 'FZICU']:
+        for days in TREND_WINDOWS:
+            mean = grouped[key].transform(lambda s: s.rolling('%dD' % days).mean())
+            df_fa['%s %dT Mittel' % (key, days)] = mean.values[skip:]
+
+    for key in ['FZHosp', 'FZICU']:
+        # value of the calendar day before, nan if there was no report that day
+        before = grouped[key].transform(lambda s: s.shift(1, freq='D').reindex(s.index))
+        change = base[key] / before - 1
+        df_fa['%s Veränderung' % key] = change.values[skip:]
+
+    return df_fa
+
+
+def source_path(fn):
+    """ path of source file, None if it is missing
+    """
+    if fn == KAZ_BETTEN:
+        return data_file(fn) if os.path.isfile(data_file(fn)) else None
+
+    return find_csv(fn)
+
+
+def build_state(name):
+    """ key of the sources and settings of frame name
+
+        the key holds path and content hash of each source, returns key and
+        fingerprints of the sources
+    """
+    known = BUILT.get(name, {}).get('fingerprints', {})
+    fps   = {}
+    key   = [ INCREMENTAL, CACHE_VERSION, str(VA_AGGREGATE), str(date_window()) ]
+
+    for fn in BUILD_SOURCES[name]:
+        path = source_path(fn)
+        if path is None:
+            key.append((fn, None, None))
+            continue
+        fps[fn] = file_fingerprint(path, known.get(fn))
+        key.append((fn, os.path.abspath(path), fps[fn]['hash']))
+
+    return key, fps
+
+
+def is_built(name, key):
+    """ True if frame name is built from sources with key
+    """
+    entry = BUILT.get(name)
+    return entry is not None and entry['key'] == key
+
+
+def outdated_frames():
+    """ names of frames, that are not built or have a changed source
+    """
+    outdated = []
+    for name in BUILD_SOURCES:
+        key, fps = build_state(name)
+        if not is_built(name, key):
+            outdated.append(name)
+        else:
+            # keep the hash after a 304 download touched the file
+            BUILT[name]['fingerprints'] = fps
+
+    return outdated
+
+
+def parse_source(fn):
+    """ parse source file fn, KAZ_BETTEN gives the dict of load_kaz
+    """
+    if fn == KAZ_BETTEN:
+        with stage('read_kaz') as st:
+            kaz = load_kaz(KAZ_BETTEN)
+            st['rows'] = len(kaz['df'])
+        return kaz
+
+    with stage('import:' + fn) as st:
+        if fn == AGES_Einwohner:
+            df = population_index(fn)
+        elif fn == AGES_FALL and windowed():
+            # days before the window for the rolling means of derive_trends
+            df = import_windowed(fn, prepare_fallzahlen, pad=max(TREND_WINDOWS))
+        elif fn == AGES_FALL:
+            df = import_cached(fn, prepare_fallzahlen)
+        elif windowed():
+            df = import_windowed(fn, prepare_impfungen, aggregate_impfungen)
+        elif INCREMENTAL:
+            df = import_incremental(fn, prepare_impfungen, inputs={ 'aggregate': VA_AGGREGATE }, schema=CSV_SCHEMAS[fn],
+                                    finish=aggregate_impfungen)
+        else:
+            df = import_cached(fn, prepare_impfungen, import_impfungen, inputs={ 'aggregate': VA_AGGREGATE })
+        st['rows'] = len(df)
+
+    return df
+
+
+def parse_worker(settings, fn):
+    """ parse source fn in a worker process
+
+        settings are the WORKER_SETTINGS of the parent, returns the parsed
+        source and the recorded stages
+    """
+    for name, value in settings.items():
+        globals()[name] = value
+    del STAGE_STATS[:]
+
+    return parse_source(fn), STAGE_STATS
+
+
+def parse_sources(files):
+    """ parse source files in a pool of PARSE_WORKERS processes
+
+        returns dict with the parsed source of each file
+    """
+    size = sum(os.path.getsize(source_path(fn)) for fn in files if source_path(fn) is not None)
+
+    # starting the workers costs more than parsing small files
+    if PARSE_WORKERS <= 1 or len(files) <= 1 or size < PARSE_POOL_MIN_MB * 1024 * 1024:
+        return { fn: parse_source(fn) for fn in files }
+
+    from concurrent.futures import ProcessPoolExecutor
+    # loaded once, forked workers inherit it
+    import pandas
+
+    settings = { name: globals()[name] for name in WORKER_SETTINGS }
+    parsed   = {}
+
+    # the pyarrow readers of the workers share the cores
+    settings['ARROW_THREADS'] = max(1, (os.cpu_count() or 1) // min(PARSE_WORKERS, len(files)))
+
+    print_dbg(VERBOSE,"parsing %s in %s processes" % (', '.join(files),min(PARSE_WORKERS, len(files))))
+
+    with ProcessPoolExecutor(max_workers=min(PARSE_WORKERS, len(files))) as pool:
+        jobs = { fn: pool.submit(parse_worker, settings, fn) for fn in files }
+
+        for fn in files:
+            parsed[fn], stages = jobs[fn].result()
+            for st in stages:
+                st['level'] += len(STAGE_STACK)
+                st['worker'] = True
+            STAGE_STATS.extend(stages)
+
+    # keep the KAZ sheet for the export
+    if KAZ_BETTEN in parsed:
+        KAZ_LOADED.clear()
+        KAZ_LOADED[kaz_key(data_file(KAZ_BETTEN))] = parsed[KAZ_BETTEN]
+
+    return parsed
+
+
+def build_fallzahlen(parsed):
+    """ AGES_FALL with the calculated columns
+
+        parsed holds AGES_Einwohner, KAZ_BETTEN and, if not INCREMENTAL or
+        windowed, AGES_FALL of parse_sources
+    """
+    # population per Bundesland
+    einwohner = parsed[AGES_Einwohner]
+
+    print_dbg(DEBUG,"Einwohner: %s" % einwohner)
+
+    # KAZ file to dataframe
+    df_bed = parsed[KAZ_BETTEN]['df'].copy()
+
+    print_dbg(DEBUG,"")
+    print_dbg(DEBUG,"-- 0 ----------------------------------")
+    print_dbg(INFO,"processing source data...")
+
+    # original column header
+    # Index(['Unnamed: 0', 'Österreich', 'BGLD', 'KTN', 'NÖ', 'OÖ', 'SBG', 'STM', 'TIR', 'VLB', 'WIEN'],
+    df_bed.rename(columns={'BGLD': 'Burgenland',
+                           'KTN' : 'Kärnten',
+                           'NÖ'  : 'Niederösterreich',
+                           'OÖ'  : 'Oberösterreich',
+                           'SBG' : 'Salzburg',
+                           'STM' : 'Steiermark',
+                           'TIR' : 'Tirol',
+                           'VLB' : 'Vorarlberg',
+                           'WIEN': 'Wien',
+                           }, inplace=True)
+
+    print_dbg(DEBUG,"Column Einwohner: %s" % df_bed.columns)
+
+    # get all the ICU beds
+    at_beds = {}
+    for key in BUNDESLAENDER:
+        x = df_bed[key].values[0]
+        try:
+            at_beds[key] = int(x)
+        except (TypeError, ValueError):
+            # e.g. a formula without value, saved by another program than Excel
+            raise ValueError("%s: ICU beds of %s are not a number: %s" % (KAZ_BETTEN,key,x))
+        print_dbg(DEBUG,"Val Bed  : %s" % x)
+
+    print_dbg(DEBUG,"Column Einwohner: %s" % df_bed.head())
+    print_dbg(DEBUG,"-- 1 ----------------------------------")
+
+    if INCREMENTAL and not windowed():
+        # derived rows are kept in the state, so beds and einwohner are needed first
+        with stage('import:' + AGES_FALL) as st:
+            inputs = { 'beds': at_beds, 'einwohner': einwohner }
+            df_fa  = import_incremental(AGES_FALL, prepare_fallzahlen,
+                                        lambda df, prev: derive_fallzahlen(df, at_beds, einwohner, prev), inputs,
+                                        schema=CSV_SCHEMAS[AGES_FALL], history=max(TREND_WINDOWS))
+            st['rows'] = len(df_fa)
+    else:
+        with stage('derive:' + AGES_FALL) as st:
+            df_fa  = derive_fallzahlen(parsed[AGES_FALL], at_beds, einwohner)
+            if windowed():
+                # drop the padding
+                since, until = date_window()
+                if since is not None:
+                    df_fa = df_fa.loc[df_fa.index >= since]
+            st['rows'] = len(df_fa)
+
+    return df_fa
+
+
+def run_build():
+    """ build dataframes with all rows
+
+        frames of unchanged sources are taken from the last build in this
+        process, they must not be changed by the caller
+    """
+    states = { name: build_state(name) for name in BUILD_SOURCES }
+
+    for name in BUILD_SOURCES:
+        if is_built(name, states[name][0]):
+            print_dbg(VERBOSE,"%s unchanged, using frame in memory" % name)
+            BUILT[name]['fingerprints'] = states[name][1]
+
+    # independent source files are parsed in parallel, largest first
+    files = []
+    if not is_built('impfungen', states['impfungen'][0]):
+        files.append(AGES_IMPFUNG)
+    if not is_built('fallzahlen', states['fallzahlen'][0]):
+        files += [AGES_Einwohner, KAZ_BETTEN] + ([] if INCREMENTAL and not windowed() else [AGES_FALL])
+
+    parsed = parse_sources(files)
+
+    if AGES_IMPFUNG in parsed:
+        BUILT['impfungen'] = { 'key': states['impfungen'][0], 'fingerprints': states['impfungen'][1],
+                               'df' : parsed[AGES_IMPFUNG] }
+    if AGES_Einwohner in parsed:
+        BUILT['fallzahlen'] = { 'key': states['fallzahlen'][0], 'fingerprints': states['fallzahlen'][1],
+                                'df' : build_fallzahlen(parsed) }
+
+    df_fa = BUILT['fallzahlen']['df']
+    df_va = BUILT['impfungen']['df']
+
+    print_dbg(DEBUG,"Column FA: %s" % df_fa.columns)
+    print_dbg(DEBUG,"Column FA: %s" % df_fa.head(20))
+
+    print_dbg(DEBUG,"-- 2 -----------------------------------")
+
+    # sheet 1: build columns for sheet 1
+    df_fa1 = df_fa.loc[:, SHEET_COLUMNS['Intensiv']]
+
+    # sheet 2: build columns for sheet 2
+    df_fa2 = df_fa.loc[:, SHEET_COLUMNS['Total']]
+
+
+    print_dbg(INFO," data preparation finished")
+
+    return [ df_fa, df_fa1, df_fa2, df_va ]
+
+
+
+def sheet_format(sn):
+    """ formats of sheet sn, parts like Impfungen_2 use those of Impfungen
+    """
+    if sn not in SHEET_FORMATS and '_' in sn:
+        return SHEET_FORMATS[sn.rsplit('_', 1)[0]]
+
+    return SHEET_FORMATS[sn]
+
+
+def sheet_positions(sn, ncols, columns=None):
+    """ position of each column in SHEET_FORMATS and position of the last column
+
+        with the column names the positions are looked up by name in
+        SHEET_COLUMNS, e.g. for a selection of the columns. None has no format
+    """
+    layout = SHEET_COLUMNS.get(sn, SHEET_COLUMNS.get(sn.rsplit('_', 1)[0]))
+
+    if columns is None or layout is None:
+        return list(range(1, ncols + 1)), ncols
+
+    return [1] + [ layout.index(col) + 2 if col in layout else None for col in columns ], len(layout) + 1
+
+
+def sheet_styles(ws, sn, ncols, columns=None):
+    """ template cell with the number format of each column of sheet sn
+
+        columns without number format have no template. The colors are
+        set by sheet_fills
+    """
+    from openpyxl.styles import Font, Border, Side, Alignment
+    from openpyxl.cell import WriteOnlyCell
+
+    fmt = sheet_format(sn)
+
+    positions, last = sheet_positions(sn, ncols, columns)
+
+    # header style like pandas to_excel
+    thin   = Side(style='thin')
+    header = { 'font'     : Font(bold=True),
+               'border'   : Border(left=thin, right=thin, top=thin, bottom=thin),
+               'alignment': Alignment(horizontal='center', vertical='top'),
+             }
+
+    styles = [None] * (ncols + 1)
+
+    for col, pos in enumerate(positions, 1):
+        cell = WriteOnlyCell(ws)
+
+        if col == 1:
+            # index column
+            for key, val in header.items():
+                setattr(cell, key, val)
+            cell.number_format = FMT_DATE
+
+        if pos in fmt['pct']:
+            cell.number_format = FMT_PCT
+
+        if pos == last or pos in fmt.get('float', []):
+            cell.number_format = FMT_FLOAT
+
+        if cell.has_style:
+            styles[col] = cell
+
+    head = WriteOnlyCell(ws)
+    for key, val in header.items():
+        setattr(head, key, val)
+
+    return head, styles
+
+
+def sheet_fills(ws, sn, ncols, nrows, columns=None):
+    """ color the columns of sheet sn with conditional formatting
+
+        one rule per column instead of a fill in the style of every cell
+    """
+    from openpyxl.styles import PatternFill
+    from openpyxl.formatting.rule import FormulaRule
+    from openpyxl.utils import get_column_letter
+
+    fmt = sheet_format(sn)
+
+    positions, last = sheet_positions(sn, ncols, columns)
+
+    if nrows < 1:
+        return
+
+    for col, pos in enumerate(positions, 1):
+        if pos not in fmt['fill']:
+            continue
+
+        color  = COL_PATTERN[fmt['fill'].index(pos)]
+        letter = get_column_letter(col)
+        # the fill of conditional formats is taken from the end color
+        fill   = PatternFill(patternType="solid", start_color=color, end_color=color)
+        ws.conditional_formatting.add('%s2:%s%d' % (letter, letter, nrows + 1), FormulaRule(formula=['TRUE'], fill=fill))
+
+
+def column_values(df):
+    """ values of index and columns as python lists
+    """
+    values = [ df.index.tolist() ]
+
+    for name in df.columns:
+        s = df[name]
+
+        if s.dtype.kind == 'f':
+            # empty cell for nan/inf
+            s = s.where(s.abs() != float('inf'))
+            values.append(s.astype(object).where(s.notna(), None).tolist())
+        else:
+            values.append(s.tolist())
+
+    return values
+
+
+def display_len(v, number_format=None):
+    """ length of value as shown with number_format
+    """
+    if isinstance(v, float):
+        if number_format == FMT_PCT:
+            return len('{:.2%}'.format(v))
+        elif number_format == FMT_FLOAT:
+            return len('{:,.1f}'.format(v))
+
+    return len(str(v))
+
+
+def value_width(s, number_format=None):
+    """ length of the longest value of series s as shown in the sheet
+    """
+    import pandas as pd
+
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return int(s.cat.categories.astype(str).str.len().max()) if len(s.cat.categories) else 0
+
+    if s.dtype.kind == 'f':
+        # nan and inf are written as empty cell
+        s = s[s.abs() != float('inf')]
+
+    if s.dtype.kind in 'iubfM' and (s.dtype.kind != 'f' or number_format in (FMT_PCT, FMT_FLOAT)):
+        # longest values are at both ends
+        if s.isna().all():
+            return 0
+        return max(display_len(s.min(), number_format), display_len(s.max(), number_format))
+
+    s = s.dropna()
+    if len(s) > WIDTH_SAMPLE_ROWS:
+        s = s.sample(WIDTH_SAMPLE_ROWS, random_state=0)
+
+    return int(s.astype(str).str.len().max()) if len(s) else 0
+
+
+def column_widths(df, styles):
+    """ width of index and columns of dataframe from the longest value
+    """
+    header = [df.index.name or ''] + [str(c) for c in df.columns]
+    series = [df.index.to_series()] + [df[c] for c in df.columns]
+
+    widths = []
+    for col, (name, s) in enumerate(zip(header, series), 1):
+        fmt   = styles[col].number_format if styles[col] is not None else None
+        width = max(len(name), value_width(s, fmt))
+        widths.append(width * 1.25)
+
+    return widths
+
+
+def register_styles(wb, cells):
+    """ add the styles of the template cells to the workbook in this order
+
+        else a style gets its id when the first cell using it is written.
+        The ids of the copied sheets stay valid in update mode
+    """
+    for cell in cells:
+        if cell is not None:
+            wb._cell_styles.add(cell._style)
+
+
+def write_sheet(wb, sn, df, widths=None, rows=True):
+    """ write dataframe with formats to new sheet sn of write-only workbook
+
+        widths are computed from the dataframe if not given. Without rows
+        the sheet gets its styles and formats only, see XLSX_UPDATE
+    """
+    from openpyxl.utils import get_column_letter
+    from openpyxl.cell import WriteOnlyCell
+
+    print_dbg(VERBOSE, " write sheet name %s to file..." % sn)
+
+    ws = wb.create_sheet(sn)
+
+    header = [df.index.name or ''] + [str(c) for c in df.columns]
+    ncols  = len(header)
+
+    head, styles = sheet_styles(ws, sn, ncols, header[1:])
+    register_styles(wb, [head] + styles)
+
+    if widths is None and rows:
+        widths = column_widths(df, styles)
+
+    # set before the first row is written
+    for col, width in enumerate(widths or [], 1):
+        ws.column_dimensions[get_column_letter(col)].width = width
+
+    ws.freeze_panes   = 'A2'
+    ws.auto_filter.ref = 'A1:%s%d' % (get_column_letter(ncols), len(df) + 1)
+
+    sheet_fills(ws, sn, ncols, len(df), header[1:])
+
+    if not rows:
+        return ws
+
+    values = column_values(df)
+
+    row = []
+    for name in header:
+        cell = WriteOnlyCell(ws, value=name)
+        cell._style = copy(head._style)
+        row.append(cell)
+    ws.append(row)
+
+    styled = [ (col - 1, tmpl) for col, tmpl in enumerate(styles) if tmpl is not None ]
+
+    # rows are written on append, so the template cells are reused
+    for row in zip(*values):
+        row = list(row)
+        for i, tmpl in styled:
+            tmpl.value = row[i]
+            row[i] = tmpl
+        ws.append(row)
+
+    print_dbg(VERBOSE," ws      : %s" % sn)
+    print_dbg(VERBOSE," max_row : %s" % (len(df) + 1))
+    print_dbg(VERBOSE," max_col : %s" % ncols)
+
+    return ws
+
+
+def write_kaz_sheet(wb, sheet, target_sheet_name, rows=True):
+    """ write model of KAZ sheet with its styles to write-only workbook
+
+        without rows the sheet gets its styles only, see XLSX_UPDATE
+    """
+    from openpyxl.utils import get_column_letter
+    from openpyxl.cell import WriteOnlyCell
+
+    print_dbg(VERBOSE,"create new worksheet %s" % target_sheet_name)
+
+    ws = wb.create_sheet(target_sheet_name)
+
+    # set cell width
+    for col in range(sheet['min_column'], sheet['max_column'] + 1):
+        ws.column_dimensions[get_column_letter(col)].width = 20
+
+    # one template per style, cells share its style
+    templates = []
+    for style in sheet['styles']:
+        cell = WriteOnlyCell(ws)
+        for key, val in style.items():
+            setattr(cell, key, val)
+        templates.append(cell)
+    register_styles(wb, templates)
+
+    if not rows:
+        return ws
+
+    for row in sheet['rows']:
+        cells = []
+        for value, sid in row:
+            if sid is None:
+                cells.append(value)
+            else:
+                cell = WriteOnlyCell(ws, value=value)
+                cell._style = copy(templates[sid]._style)
+                cells.append(cell)
+        ws.append(cells)
+
+    print_dbg(DEBUG,"Excel sheet has be copied. ")
+
+    return ws
+
+
+def export_df(df, fn):
+    """ write dataframes and the KAZ sheet to one workbook
+
+        number formats, colors, autofilter, frozen first row and column
+        widths are set while the rows are written, the file is saved once.
+        With XLSX_UPDATE only the sheets whose input changed are written,
+        the others are copied from the previous workbook.
+        returns list with the path of the workbook
+    """
+    fout = data_file(fn)
+
+    print_dbg(INFO,"saving data to %s" % fn)
+
+    # sizes are checked before anything is written
+    sheets  = plan_sheets(df)
+    outputs = [fout]
+
+    if VA_ROLLUP:
+        outputs += export_detail(df, fn)
+
+    kaz = load_kaz(KAZ_BETTEN)
+
+    manifest = xlsx_manifest(sheets, kaz) if XLSX_UPDATE else None
+    reuse    = reusable_sheets(fout, manifest) if manifest else {}
+
+    if manifest and len(reuse) == len(manifest['sheets']):
+        print_dbg(INFO,"no sheet changed, keeping %s" % fn)
+        return outputs
+
+    if reuse:
+        print_dbg(INFO,"copying unchanged sheets %s" % ', '.join(reuse))
+
+    # create new xls file
+    wb, parts = write_workbook(sheets, kaz, reuse)
+
+    merged = False
+    with stage('save_xlsx'):
+        if reuse:
+            merged = merge_package(wb, fout, reuse, parts)
+        else:
+            wb.save(fout)
+
+    if reuse and not merged:
+        # styles changed, the copied sheets would show wrong formats
+        print_dbg(INFO,"styles of %s changed, writing all sheets" % fn)
+        wb, parts = write_workbook(sheets, kaz)
+        with stage('save_xlsx'):
+            wb.save(fout)
+
+    if manifest:
+        for sn, part in parts.items():
+            manifest['sheets'][sn]['part'] = part
+        manifest['xlsx'] = file_fingerprint(fout)
+        write_json(XLSX_MANIFEST % os.path.splitext(fout)[0], manifest)
+
+    return outputs
+
+
+def write_workbook(sheets, kaz, reuse={}):
+    """ write-only workbook with the sheets and the KAZ sheet
+
+        the sheets in reuse get no rows, they are copied from the previous
+        workbook by merge_package. returns workbook and dict with the part
+        name of each sheet in the package
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+
+    for sn, frame in sheets:
+        if sn in reuse:
+            write_sheet(wb, sn, frame, rows=False)
+            continue
+
+        with stage('write_sheet:' + sn) as st:
+            write_sheet(wb, sn, frame)
+            st['rows']  = len(frame)
+            st['cells'] = len(frame) * (len(frame.columns) + 1)
+
+    if kaz is not None:
+        with stage('copy_kaz_sheet') as st:
+            rows = KAZ_SHEET not in reuse
+            write_kaz_sheet(wb, kaz['sheet'], KAZ_SHEET, rows)
+            st['rows'] = len(kaz['sheet']['rows']) if rows else 0
+
+    parts = { ws.title: XLSX_SHEET_PART % i for i, ws in enumerate(wb.worksheets, 1) }
+
+    return wb, parts
+
+
+def frame_hash(frame):
+    """ sha1 of the names, dtypes, index and values of frame
+    """
+    import pandas as pd
+
+    h = hashlib.sha1()
+    h.update(repr((frame.index.name, [str(c) for c in frame.columns], [str(t) for t in frame.dtypes])).encode('utf-8'))
+    h.update(pd.util.hash_pandas_object(frame, index=True).values.tobytes())
+
+    return h.hexdigest()
+
+
+def xlsx_manifest(sheets, kaz):
+    """ inputs of the workbook and of each sheet for XLSX_UPDATE
+
+        layout covers everything that changes the style ids, e.g. the
+        columns of a sheet. A sheet is copied only with the same layout
+    """
+    import openpyxl
+
+    layout = { 'version' : CACHE_VERSION,
+               'openpyxl': openpyxl.__version__,
+               'formats' : [ SHEET_FORMATS, SHEET_COLUMNS, COL_PATTERN, FMT_DATE, FMT_PCT, FMT_FLOAT, WIDTH_SAMPLE_ROWS ],
+               'sheets'  : [ [sn, frame.index.name, [str(c) for c in frame.columns], len(frame) > 0] for sn, frame in sheets ],
+               'kaz'     : kaz is not None and KAZ_SHEET,
+             }
+
+    manifest = { 'layout': hashlib.sha1(json.dumps(layout, sort_keys=True, default=str).encode('utf-8')).hexdigest(),
+                 'sheets': { sn: { 'hash': frame_hash(frame) } for sn, frame in sheets },
+               }
+
+    if kaz is not None:
+        manifest['sheets'][KAZ_SHEET] = { 'hash': file_hash(data_file(KAZ_BETTEN)) }
+
+    return manifest
+
+
+def reusable_sheets(fout, manifest):
+    """ sheets of workbook fout with the same input as in manifest
+
+        returns dict with the part name of each sheet in fout, empty if
+        fout was changed or written without manifest
+    """
+    prev = read_json(XLSX_MANIFEST % os.path.splitext(fout)[0])
+
+    if not prev or prev.get('layout') != manifest['layout'] or not if_file_exist(fout):
+        return {}
+
+    # e.g. saved in Excel
+    if file_fingerprint(fout, prev.get('xlsx'))['hash'] != prev.get('xlsx', {}).get('hash'):
+        print_dbg(INFO,"%s changed since the last run, writing all sheets" % fout)
+        return {}
+
+    reuse = {}
+    for sn, entry in manifest['sheets'].items():
+        old = prev['sheets'].get(sn, {})
+        if old.get('hash') == entry['hash'] and old.get('part'):
+            reuse[sn] = old['part']
+
+    return reuse
+
+
+def merge_package(wb, fout, reuse, parts):
+    """ save workbook wb to fout, the xml of the sheets in reuse is copied from fout
+
+        the workbook is a zip package, the sheet parts of the previous fout
+        are copied unchanged. The other parts like styles.xml come from wb.
+        returns False and leaves fout alone, if the styles or the part names
+        differ
+    """
+    import zipfile
+    import shutil
+
+    copied = set()
+    for sn, part in reuse.items():
+        if parts.get(sn) != part:
+            return False
+        copied.add(part)
+
+    new = fout + '.new'
+    wb.save(new)
+
+    try:
+        with zipfile.ZipFile(fout) as zold, zipfile.ZipFile(new) as znew:
+            if zold.read('xl/styles.xml') != znew.read('xl/styles.xml'):
+                return False
+
+            def write(tmp):
+                with zipfile.ZipFile(tmp, 'w', zipfile.ZIP_DEFLATED) as zout:
+                    for info in znew.infolist():
+                        src  = zold if info.filename in copied else znew
+                        size = src.getinfo(info.filename).file_size
+
+                        entry = zipfile.ZipInfo(info.filename, info.date_time)
+                        entry.compress_type = zipfile.ZIP_DEFLATED
+
+                        with src.open(info.filename) as fin, \
+                                zout.open(entry, 'w', force_zip64=size * 1.05 > zipfile.ZIP64_LIMIT) as fo:
+                            shutil.copyfileobj(fin, fo, DOWNLOAD_CHUNK)
+
+            replace_file(fout, write)
+    finally:
+        os.remove(new)
+
+    return True
+
+
+def split_frame(df, max_rows):
+    """ split frame into parts of at most max_rows rows
+
+        the index is sorted, rows of one date stay in one part unless the
+        date alone has more than max_rows rows
+    """
+    if len(df) <= max_rows:
+        return [df]
+
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index(kind='stable')
+
+    parts = []
+    start = 0
+    while start < len(df):
+        end = min(start + max_rows, len(df))
+        if end < len(df):
+            # first row of the date at the cut
+            cut = df.index.searchsorted(df.index[end], side='left')
+            if cut > start:
+                end = cut
+        parts.append(df.iloc[start:end])
+        start = end
+
+    return parts
+
+
+def plan_sheets(df):
+    """ name and frame of the sheets of the workbook
+
+        frames with more rows than an xlsx sheet can hold are split into
+        sheets Impfungen_1, Impfungen_2, ... by date. With VA_ROLLUP the
+        sheet Impfungen gets the sums per date, state and dose.
+    """
+    df_va = df[3]
+    if VA_ROLLUP and df_va is not None:
+        df_va = aggregate_impfungen(df_va, VA_ROLLUP_COLUMNS)
+
+    # last day
+    sheets = [ ('Intensiv', df[1]), ('Total', last_day(df[2])), ('Impfungen', df_va) ]
+
+    # all
+    #sheets[1] = ('Total', df[2])
+
+    plan = []
+    for sn, frame in sheets:
+        # not selected by a batch target
+        if frame is None:
+            continue
+
+        parts = split_frame(frame, XLSX_MAX_ROWS - 1)
+        if len(parts) == 1:
+            plan.append((sn, frame))
+            continue
+
+        print_dbg(INFO,"%s has %s rows, more than a sheet can hold, writing %s sheets" % (sn,len(frame),len(parts)))
+        for i, part in enumerate(parts, 1):
+            print_dbg(VERBOSE,"  %s_%d: %s - %s" % (sn,i,part.index[0],part.index[-1]))
+            plan.append(('%s_%d' % (sn, i), part))
+
+    return plan
+
+
+def last_day(df):
+    """ rows of the last report date, None stays None
+    """
+    if df is None or not len(df):
+        return df
+
+    return df.loc[df.index == df.index.max()]
+
+
+def export_detail(df, fn):
+    """ write all rows of Impfungen next to the workbook with the rollup
+
+        parquet if pyarrow is available, else csv.gz. Nothing is written if
+        the format is written by its exporter anyway
+    """
+    fmt = 'parquet' if frame_format() == '.parquet' else 'csv.gz'
+    if fmt in EXPORT_FORMATS or df[3] is None:
+        return []
+
+    fout = export_paths(fmt, fn)[EXPORT_TABLES.index('Impfungen')]
+
+    with stage('export_detail:' + fmt) as st:
+        print_dbg(INFO,"saving Impfungen to %s" % fout)
+        write_table(df[3], fout)
+        st['rows'] = len(df[3])
+
+    return [fout]
+
+
+def export_tables(df):
+    """ name and frame of the tables written by the data exporters
+
+        tables not selected by a batch target are None and left out
+    """
+    return [ (name, frame) for name, frame in zip(EXPORT_TABLES, [df[1], df[2], df[3]]) if frame is not None ]
+
+
+def export_paths(fmt, fn, tables=None):
+    """ files written by exporter fmt for output file fn, default for
+        all EXPORT_TABLES
+    """
+    base = os.path.splitext(fn)[0]
+
+    if fmt == 'xlsx':
+        return [data_file(fn)]
+    elif fmt == 'sqlite':
+        return [data_file(base + '.sqlite')]
+
+    return [ data_file('%s_%s.%s' % (base, name, fmt)) for name in (tables or EXPORT_TABLES) ]
+
+
+def replace_file(fout, write):
+    """ call write(tmp) and rename tmp to fout
+    """
+    try:
+        write(fout + '.tmp')
+        os.replace(fout + '.tmp', fout)
+    except BaseException:
+        if os.path.exists(fout + '.tmp'):
+            os.remove(fout + '.tmp')
+        raise
+
+
+def write_table(frame, fout):
+    """ write frame to a parquet or csv.gz file, depending on the extension
+    """
+    if fout.endswith('.parquet'):
+        replace_file(fout, lambda tmp: frame.to_parquet(tmp))
+    else:
+        replace_file(fout, lambda tmp: frame.to_csv(tmp, compression='gzip'))
+
+
+def export_parquet(df, fn):
+    """ write each table to a parquet file
+    """
+    tables = export_tables(df)
+    paths  = export_paths('parquet', fn, [ name for name, frame in tables ])
+
+    for (name, frame), fout in zip(tables, paths):
+        print_dbg(INFO,"saving %s to %s" % (name,fout))
+        write_table(frame, fout)
+
+    return paths
+
+
+def export_csv(df, fn):
+    """ write each table to a gzip compressed csv file
+    """
+    tables = export_tables(df)
+    paths  = export_paths('csv.gz', fn, [ name for name, frame in tables ])
+
+    for (name, frame), fout in zip(tables, paths):
+        print_dbg(INFO,"saving %s to %s" % (name,fout))
+        write_table(frame, fout)
+
+    return paths
+
+
+def export_sqlite(df, fn):
+    """ write all tables to one sqlite database
+    """
+    import sqlite3
+
+    fout = export_paths('sqlite', fn)[0]
+
+    def write(tmp):
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        con = sqlite3.connect(tmp)
+        try:
+            for name, frame in export_tables(df):
+                print_dbg(INFO,"saving %s to %s" % (name,fout))
+                frame.to_sql(name, con, index=True, chunksize=100000)
+            con.commit()
+        finally:
+            con.close()
+
+    replace_file(fout, write)
+
+    return [fout]
+
+
+# output formats, selected with --format
+EXPORTERS = { 'xlsx'   : export_df,
+              'parquet': export_parquet,
+              'csv.gz' : export_csv,
+              'sqlite' : export_sqlite,
+            }
+
+
+'''
+   Check whether the file exist or not.
+   file_path : the input file path with name.
+   Return True if the file exist otherwise return False.
+   https://www.dev2qa.com/how-to-use-python-openpyxl-to-copy-excel-sheet-data-in-same-and-different-excel-file
+'''
+def if_file_exist(file_path):
+     if os.path.exists(file_path):
+         return True
+     else:
+         return False
+
+def export_timed(fmt, df):
+    """ run exporter fmt in a thread, returns written files and stage record
+
+        stage() keeps the stack of the main thread, so the time is taken here
+    """
+    t0 = time.perf_counter()
+    c0 = time.thread_time()
+
+    paths = EXPORTERS[fmt](df, AT_HOSP)
+
+    st = { 'stage'         : 'export:' + fmt,
+           'level'         : 1,
+           'wall'          : round(time.perf_counter() - t0, 4),
+           'cpu'           : round(time.thread_time() - c0, 4),
+           'peak_traced_mb': None,
+           'max_rss_mb'    : max_rss_mb(),
+           'rows'          : sum(len(x) for x in df[1:]),
+         }
+
+    return paths, st
+
+
+def export_all(df):
+    """ write frames in all EXPORT_FORMATS
+
+        the data formats are written in threads while the workbook is
+        written, parquet and gzip do most of their work without the GIL.
+        returns list of written files
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    outputs = []
+    data    = [ fmt for fmt in EXPORT_FORMATS if fmt != 'xlsx' ]
+
+    with ThreadPoolExecutor(max_workers=max(1, len(data))) as pool:
+        jobs = [ (fmt, pool.submit(export_timed, fmt, df)) for fmt in data ]
+
+        if 'xlsx' in EXPORT_FORMATS:
+            with stage('export_df') as st:
+                outputs += export_df(df,AT_HOSP)
+                st['cells'] = sum(len(x) * (len(x.columns) + 1) for x in [df[1], last_day(df[2]), df[3]])
+
+        for fmt, job in jobs:
+            paths, st = job.result()
+            print_dbg(VERBOSE,"stage %s: %.3fs wall, %.3fs cpu" % (st['stage'],st['wall'],st['cpu']))
+            STAGE_STATS.append(st)
+            outputs += paths
+
+    return outputs
+
+
+def load_targets(fn):
+    """ targets of batch config file fn
+
+        { "targets": [ { "output"    : "AT_Hospitalisierung_Wien.xlsx",
+                         "format"    : "xlsx",
+                         "bundesland": ["Wien"],
+                         "sheets"    : ["Intensiv", "Total"],
+                         "columns"   : { "Intensiv": ["FZHosp", "FZICU", "Bundesland"] },
+                         "rollup"    : false }, ... ] }
+
+        only output is needed, the default is all Bundeslaender, sheets and
+        columns in format xlsx. raises ValueError
+    """
+    with open(fn, 'r', encoding='utf-8') as f:
+        batch = json.load(f)
+
+    targets = batch.get('targets') if isinstance(batch, dict) else None
+    if not targets:
+        raise ValueError("%s has no targets" % fn)
+
+    seen = set()
+    for i, target in enumerate(targets, 1):
+        unknown = set(target) - set(TARGET_KEYS)
+        if unknown:
+            raise ValueError("target %d: unknown keys %s, use %s" % (i,', '.join(sorted(unknown)),', '.join(TARGET_KEYS)))
+        if not target.get('output'):
+            raise ValueError("target %d: output is missing" % i)
+
+        target.setdefault('format', 'xlsx')
+        if target['format'] not in EXPORTERS:
+            raise ValueError("target %d: unknown format %s, use %s" % (i,target['format'],', '.join(EXPORTERS)))
+        if target['format'] == 'parquet' and importlib.util.find_spec('pyarrow') is None:
+            raise ValueError("target %d: format parquet needs module pyarrow" % i)
+
+        unknown = set(target.get('bundesland') or []) - set(BUNDESLAENDER)
+        if unknown:
+            raise ValueError("target %d: unknown Bundesland %s" % (i,', '.join(sorted(unknown))))
+
+        unknown = (set(target.get('sheets') or []) | set(target.get('columns') or {})) - set(EXPORT_TABLES)
+        if unknown:
+            raise ValueError("target %d: unknown sheets %s, use %s" % (i,', '.join(sorted(unknown)),', '.join(EXPORT_TABLES)))
+
+        # the rollup sums up per date and VA_ROLLUP_COLUMNS
+        selected = (target.get('columns') or {}).get('Impfungen')
+        if target.get('rollup', VA_ROLLUP) and selected is not None:
+            missing = [ col for col in VA_ROLLUP_COLUMNS + ['vaccinations_administered_cumulative'] if col not in selected ]
+            if missing:
+                raise ValueError("target %d: rollup needs the Impfungen columns %s" % (i,', '.join(missing)))
+
+        # workers must not write the same file
+        key = (target['format'], target['output'])
+        if key in seen:
+            raise ValueError("target %d: %s is written twice" % (i,target['output']))
+        seen.add(key)
+
+    return targets
+
+
+def target_frames(df, target):
+    """ frames of run_build filtered by Bundesland, sheets and columns of target
+
+        sheets not selected are None
+    """
+    sheets  = target.get('sheets') or EXPORT_TABLES
+    lands   = target.get('bundesland')
+    columns = target.get('columns') or {}
+
+    frames = [ df[0] ]
+    for name, frame, key in zip(EXPORT_TABLES, df[1:], ['Bundesland', 'Bundesland', 'state_name']):
+        if name not in sheets:
+            frames.append(None)
+            continue
+
+        if lands:
+            frame = frame.loc[frame[key].isin(lands).values]
+
+        if name in columns:
+            unknown = [ col for col in columns[name] if col not in frame.columns ]
+            if unknown:
+                raise ValueError("%s: unknown columns of %s: %s" % (target['output'],name,', '.join(unknown)))
+            frame = frame.loc[:, columns[name]]
+
+        frames.append(frame)
+
+    return frames
+
+
+def export_target(df, target):
+    """ write target of a batch config from the frames of run_build
+
+        returns list of written files
+    """
+    global VA_ROLLUP
+
+    rollup = VA_ROLLUP
+    VA_ROLLUP = target.get('rollup', VA_ROLLUP)
+    try:
+        with stage('target:' + target['output']) as st:
+            frames = target_frames(df, target)
+            paths  = EXPORTERS[target['format']](frames, target['output'])
+            st['rows'] = sum(len(x) for x in frames[1:] if x is not None)
+    finally:
+        VA_ROLLUP = rollup
+
+    return paths
+
+
+def batch_init(settings):
+    """ initializer of a batch worker process
+
+        settings are the WORKER_SETTINGS of the parent and the shared
+        frames in BATCH_FRAMES. Forked workers get them without pickling
+    """
+    for name, value in settings.items():
+        globals()[name] = value
+
+
+def batch_worker(target):
+    """ write target in a worker process, returns written files and the
+        recorded stages
+    """
+    del STAGE_STATS[:]
+
+    return export_target(BATCH_FRAMES, target), STAGE_STATS
+
+
+def target_failed(target, e):
+    """ report target, that could not be written, returns its output
+    """
+    print_dbg(ERROR,"ERROR - target %s failed: %s: %s" % (target['output'],type(e).__name__,e))
+
+    return target['output']
+
+
+def export_targets(df, targets):
+    """ write the targets of a batch config in PARSE_WORKERS processes
+
+        the frames are parsed and derived once, every worker filters its
+        target from them. A failed target does not stop the others.
+        returns list of written files and list of failed outputs
+    """
+    workers = min(PARSE_WORKERS, len(targets))
+    outputs = []
+    failed  = []
+
+    if workers <= 1:
+        for target in targets:
+            try:
+                outputs += export_target(df, target)
+            except Exception as e:
+                failed.append(target_failed(target, e))
+        return outputs, failed
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    settings = { name: globals()[name] for name in WORKER_SETTINGS }
+    settings.update({ 'EXPORT_FORMATS': EXPORT_FORMATS,
+                      'VA_ROLLUP'     : VA_ROLLUP,
+                      'PROFILE'       : PROFILE,
+                      'KAZ_LOADED'    : KAZ_LOADED,
+                      'BATCH_FRAMES'  : df,
+                    })
+
+    print_dbg(VERBOSE,"writing %s targets in %s processes" % (len(targets),workers))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=batch_init, initargs=(settings,)) as pool:
+        jobs = [ pool.submit(batch_worker, target) for target in targets ]
+
+        for target, job in zip(targets, jobs):
+            try:
+                paths, stages = job.result()
+            except Exception as e:
+                failed.append(target_failed(target, e))
+                continue
+            for st in stages:
+                st['level'] += len(STAGE_STACK)
+                st['worker'] = True
+            STAGE_STATS.extend(stages)
+            outputs += paths
+
+    return outputs, failed
+
+
+# --------------------------------------------------------------------
+
+def settings():
+    """ current value of the settings of configure
+    """
+    return { 'data_dir'   : data_home + subdir,
+             'output'     : AT_HOSP,
+             'formats'    : list(EXPORT_FORMATS),
+             'rollup'     : VA_ROLLUP,
+             'download'   : True,
+             'cache'      : CACHE,
+             'incremental': INCREMENTAL,
+             'workers'    : PARSE_WORKERS,
+             'csv_engine' : CSV_ENGINE,
+             'since'      : WINDOW_SINCE,
+             'until'      : WINDOW_UNTIL,
+             'last'       : WINDOW_LAST,
+             'as_of'      : AS_OF,
+             'mirror'     : MIRROR,
+             'update'     : XLSX_UPDATE,
+             'profile'    : PROFILE,
+             'interval'   : WATCH_INTERVAL,
+           }
+
+
+def configure(config=None, base=None):
+    """ apply settings of config dict, returns all settings
+
+        keys: data_dir, output, formats, rollup, download, cache,
+        incremental, workers, csv_engine, since, until, last, as_of,
+        mirror, update, profile, interval
+        settings not in config are taken from base, e.g. DEFAULT_CONFIG,
+        or keep their current value
+    """
+    global data_home, subdir, AT_HOSP, EXPORT_FORMATS, VA_ROLLUP, CACHE, INCREMENTAL, PARSE_WORKERS, CSV_ENGINE, AS_OF, MIRROR, PROFILE
+    global XLSX_UPDATE, WATCH_INTERVAL
+    global WINDOW_SINCE, WINDOW_UNTIL, WINDOW_LAST
+
+    cfg = dict(base) if base is not None else settings()
+
+    unknown = set(config or {}) - set(cfg)
+    if unknown:
+        raise ValueError("unknown settings: %s" % ', '.join(sorted(unknown)))
+
+    cfg.update(config or {})
+
+    unknown = set(cfg['formats']) - set(EXPORTERS)
+    if unknown or not cfg['formats']:
+        raise ValueError("unknown formats: %s, use %s" % (', '.join(sorted(unknown)),', '.join(EXPORTERS)))
+    if 'parquet' in cfg['formats'] and importlib.util.find_spec('pyarrow') is None:
+        raise ValueError("format parquet needs module pyarrow")
+    if cfg['csv_engine'] not in CSV_ENGINES:
+        raise ValueError("unknown csv engine: %s, use %s" % (cfg['csv_engine'],', '.join(CSV_ENGINES)))
+    if cfg['csv_engine'] == 'pyarrow' and importlib.util.find_spec('pyarrow') is None:
+        raise ValueError("csv engine pyarrow needs module pyarrow")
+    for key in ['since', 'until', 'as_of']:
+        if cfg[key] is not None:
+            # raises ValueError
+            datetime.strptime(cfg[key], '%Y-%m-%d')
+    if cfg['last'] is not None and int(cfg['last']) < 1:
+        raise ValueError("last needs at least 1 day")
+    if not float(cfg['interval']) >= 0:
+        raise ValueError("interval must be 0 or more seconds")
+
+    head, tail  = os.path.split(os.path.normpath(cfg['data_dir']))
+    data_home      = (head or '.') + DIR_SEP
+    subdir         = tail
+    AT_HOSP        = cfg['output']
+    EXPORT_FORMATS = list(cfg['formats'])
+    VA_ROLLUP      = cfg['rollup']
+    CACHE          = cfg['cache']
+    INCREMENTAL    = cfg['incremental']
+    PARSE_WORKERS  = int(cfg['workers'])
+    CSV_ENGINE     = cfg['csv_engine']
+    WINDOW_SINCE   = cfg['since']
+    WINDOW_UNTIL   = cfg['until']
+    WINDOW_LAST    = int(cfg['last']) if cfg['last'] is not None else None
+    AS_OF          = cfg['as_of']
+    MIRROR         = cfg['mirror']
+    XLSX_UPDATE    = cfg['update']
+    PROFILE        = cfg['profile']
+    WATCH_INTERVAL = float(cfg['interval'])
+
+    if PROFILE and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    return cfg
+
+
+# settings at import, config of build, check, download and watch is
+# relative to them and not to the settings of the last call
+DEFAULT_CONFIG = settings()
+
+
+def check(config=None):
+    """ names of source files, that need a download
+    """
+    configure(config, DEFAULT_CONFIG)
+
+    return stale_files()
+
+
+def download(config=None):
+    """ download changed source files, returns list of updated files
+    """
+    configure(config, DEFAULT_CONFIG)
+    make_data_dir()
+
+    del STAGE_STATS[:]
+    try:
+        with stage('download') as st:
+            updated = download_files()
+            st['files'] = len(updated)
+    finally:
+        write_stats()
+
+    return updated
+
+
+def build(config=None, targets=None):
+    """ download sources if needed, build dataframes and write them in
+        the selected formats or, with targets of load_targets, write the
+        targets of a batch config
+
+        returns dict with
+          config : settings used
+          updated: downloaded files
+          frames : [df_fa, df_fa1, df_fa2, df_va] of run_build
+          output : path of the workbook, None without format xlsx
+          outputs: all written files
+          stages : timing of the stages
+
+        with as_of the sources of that day are restored from the archive
+        and the files are written to data/archive/asof/<as_of>, last then
+        counts the days back from as_of
+    """
+    cfg = configure(config, DEFAULT_CONFIG)
+
+    if AS_OF is not None:
+        asof_dir = archive_restore(AS_OF)
+        until    = cfg['until'] or (cfg['as_of'] if cfg['last'] else None)
+        try:
+            return build(dict(config or {}, data_dir=asof_dir, download=False, as_of=None, until=until), targets)
+        finally:
+            configure({ 'data_dir': cfg['data_dir'], 'as_of': cfg['as_of'], 'until': cfg['until'] })
+
+    make_data_dir()
+
+    del STAGE_STATS[:]
+    updated = []
+    outputs = []
+    failed  = []
+    try:
+        if cfg['download']:
+            with stage('download') as st:
+                updated = download_files()
+                st['files'] = len(updated)
+
+        with stage('run_build') as st:
+            df = run_build()
+            st['rows'] = sum(len(x) for x in [df[0], df[3]])
+
+        if targets is not None:
+            outputs, failed = export_targets(df, targets)
+        else:
+            outputs = export_all(df)
+    finally:
+        write_stats()
+
+    return { 'config' : cfg,
+             'updated': updated,
+             'frames' : df,
+             'output' : data_file(AT_HOSP) if 'xlsx' in EXPORT_FORMATS and targets is None else None,
+             'outputs': outputs,
+             'failed' : failed,
+             'stages' : list(STAGE_STATS),
+           }
+
+
+def batch(config=None, fn='targets.json'):
+    """ build dataframes once and write all targets of batch config file fn
+
+        returns dict like build()
+    """
+    return build(config, load_targets(fn))
+
+
+def watch(config=None, interval=None, runs=None):
+    """ poll the sources every interval seconds and rebuild the workbook
+
+        the workbook is written again only if a source changed. Parsed and
+        derived frames stay in memory, only frames with a changed source
+        are built again. interval overrides the interval setting, runs
+        limits the number of polls, None runs forever
+    """
+    cfg = configure(config, DEFAULT_CONFIG)
+    if interval is None:
+        interval = WATCH_INTERVAL
+
+    n = 0
+    while runs is None or n < runs:
+        if n:
+            time.sleep(interval)
+        n += 1
+
+        try:
+            if cfg['download']:
+                make_data_dir()
+                download_files(poll=True)
+
+            outdated = outdated_frames()
+            missing = [ fout for fmt in EXPORT_FORMATS for fout in export_paths(fmt, AT_HOSP) if not os.path.isfile(fout) ]
+            if outdated or missing:
+                print_dbg(INFO,"rebuilding %s, changed: %s" % (AT_HOSP,', '.join(outdated)))
+                build(dict(cfg, download=False))
+            else:
+                print_dbg(VERBOSE,"sources unchanged")
+        except Exception as e:
+            # keep watching, e.g. after a broken download
+            print_dbg(ERROR,"ERROR - %s: %s" % (type(e).__name__,e))
+
+
+# --------------------------------------------------------------------
+
+def usage():
+    print("usage: %s [options] [check|download|build|watch|batch FILE]" % os.path.basename(sys.argv[0]))
+    print("  check           list missing or outdated source files, exit code 1 if there are any")
+    print("  download        download outdated source files only")
+    print("  build           build %s from the local source files" % AT_HOSP)
+    print("  watch           poll the sources and rebuild %s when one of them changed" % AT_HOSP)
+    print("  batch FILE      build once and write the targets of batch config FILE")
+    print("  without command outdated files are downloaded and %s is built" % AT_HOSP)
+    print("")
+    print("  -d, --data DIR   data dir (default %s)" % (data_home + subdir))
+    print("  -o, --output FN  name of the workbook in the data dir (default %s)" % AT_HOSP)
+    print("  -f, --format F   output formats, comma separated: %s (default %s)" % (', '.join(EXPORTERS),','.join(EXPORT_FORMATS)))
+    print("      --rollup     sheet Impfungen with sums per date, state and dose, all rows to %s_Impfungen.parquet"
+          % os.path.splitext(AT_HOSP)[0])
+    print("      --incremental process only new report dates, the derived rows are kept in %s" % data_file(STATE_DIR))
+    print("      --since DAY  build only report dates from DAY on (yyyy-mm-dd)")
+    print("      --until DAY  build only report dates up to DAY (yyyy-mm-dd)")
+    print("      --last N     build only the report dates of the last N days")
+    print("      --as-of DAY  build from the sources archived on DAY (yyyy-mm-dd), written to %s" % archive_path('asof', 'DAY'))
+    print("  -u, --update     write only the sheets whose input changed, copy the others from the previous %s" % AT_HOSP)
+    print("  -m, --mirror URL download from a local mirror (at_hosp_mirror.py) instead of the AGES/KAZ servers")
+    print("  -w, --workers N  processes parsing the source files or writing batch targets (default %s)" % PARSE_WORKERS)
+    print("      --csv-engine E csv parser: %s (default %s)" % (', '.join(CSV_ENGINES),CSV_ENGINE))
+    print("  -i, --interval S seconds between polls of watch (default %s)" % WATCH_INTERVAL)
+    print("  -p, --profile    write cProfile and tracemalloc dumps of each stage to %s" % data_file(PROFILE_DIR))
+
+
+if __name__ == "__main__":
+
+    try:
+        opts, args = getopt.gnu_getopt(sys.argv[1:], "hpud:o:f:m:w:i:", ["help", "profile", "update", "incremental", "data=", "output=", "format=", "rollup", "since=", "until=", "last=", "as-of=", "mirror=", "workers=", "csv-engine=", "interval="])
+    except getopt.GetoptError as e:
+        print(e)
+        usage()
+        sys.exit(2)
+
+    config = {}
+    for o, a in opts:
+        if o in ("-h", "--help"):
+            usage()
+            sys.exit(0)
+        elif o in ("-p", "--profile"):
+            config['profile'] = True
+        elif o in ("-d", "--data"):
+            config['data_dir'] = a
+        elif o in ("-o", "--output"):
+            config['output'] = a
+        elif o in ("-f", "--format"):
+            config['formats'] = [ x.strip() for x in a.split(',') if x.strip() ]
+        elif o == "--rollup":
+            config['rollup'] = True
+        elif o == "--incremental":
+            config['incremental'] = True
+        elif o == "--since":
+            config['since'] = a
+        elif o == "--until":
+            config['until'] = a
+        elif o == "--last":
+            config['last'] = a
+        elif o == "--as-of":
+            config['as_of'] = a
+        elif o in ("-u", "--update"):
+            config['update'] = True
+        elif o in ("-m", "--mirror"):
+            config['mirror'] = a
+        elif o in ("-w", "--workers"):
+            config['workers'] = a
+        elif o == "--csv-engine":
+            config['csv_engine'] = a
+        elif o in ("-i", "--interval"):
+            config['interval'] = a
+
+    command = args[0] if args else 'run'
+    nargs   = 2 if command == 'batch' else 1
+    if command not in ('run', 'check', 'download', 'build', 'watch', 'batch') or len(args) > nargs \
+            or (command == 'batch' and len(args) < nargs):
+        usage()
+        sys.exit(2)
+
+    try:
+        configure(config)
+    except ValueError as e:
+        print(e)
+        usage()
+        sys.exit(2)
+
+    if command == 'check':
+        todo = check(config)
+        sys.exit(1 if todo else 0)
+
+    if command == 'download':
+        download(config)
+        sys.exit(0)
+
+    if command == 'watch':
+        try:
+            watch(config)
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+
+    if command == 'batch':
+        try:
+            targets = load_targets(args[1])
+        except (OSError, ValueError) as e:
+            print(e)
+            sys.exit(2)
+
+        result = build(config, targets)
+        print_dbg(INFO,"%s finished" % ', '.join(os.path.basename(x) for x in result['outputs']))
+        sys.exit(1 if result['failed'] else 0)
+
+    print_dbg(INFO,"creating excel file from AGES and KAZ data")
 
-    format_cells(AT_HOSP)
-    print_dbg(INFO,"%s finished" % AT_HOSP)
+    config['download'] = command == 'run'
+    result = build(config)
 
+    print_dbg(INFO,"%s finished" % ', '.join(os.path.basename(x) for x in result['outputs']))
 
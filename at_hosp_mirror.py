@@ -0,0 +1,236 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# local mirror of the AGES and KAZ source files
+#
+#   python at_hosp_mirror.py [-d dir] [-u url] record
+#   python at_hosp_mirror.py [-d dir] [-b address] [-p port] serve
+#
+#   record  download the source files into dir (default ./mirror)
+#   serve   serve the files in dir with ETag and Last-Modified, conditional
+#           requests are answered with 304 like the AGES server does
+#
+#   -d, --dir      mirror dir
+#   -u, --upstream record from another mirror instead of the AGES/KAZ servers
+#   -b, --bind     address to listen on (default 0.0.0.0)
+#   -p, --port     port to listen on (default 8080)
+#
+# the generator downloads from the mirror with
+#   python at_hosp_csv2excel.py --mirror http://<host>:8080/
+#
+# Author:      <plix1014@gmail.com>
+#
+# Created:     18.10.2026
+# Copyright:   (c) 2021
+# Licence:     CC BY-NC-SA http://creativecommons.org/licenses/by-nc-sa/4.0/
+#-------------------------------------------------------------------------------
+
+import os, getopt, sys
+import email.utils
+import urllib.parse
+#
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import at_hosp_csv2excel as hosp
+
+
+# defaults
+MIRROR_DIR  = 'mirror'
+MIRROR_BIND = '0.0.0.0'
+MIRROR_PORT = 8080
+
+# sha1 ETag of the files without recorded ETag, key (path, size, mtime)
+FILE_ETAGS = {}
+
+# content type of the served files
+CONTENT_TYPES = { '.csv' : 'text/csv; charset=utf-8',
+                  '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                }
+
+# --------------------------------------------------------------------
+
+def record(mdir, upstream=None):
+    """ download the source files into the mirror dir
+
+        all files are requested conditionally, returns list of updated files
+    """
+    hosp.configure({ 'data_dir': mdir, 'mirror': upstream })
+    # the mirror keeps only the current version
+    hosp.ARCHIVE = False
+    hosp.make_data_dir()
+
+    return hosp.download_files(poll=True)
+
+
+def validators(mdir, fn):
+    """ ETag and Last-Modified (epoch seconds) of file fn in the mirror dir
+
+        the values sent by the upstream server are used, if they were
+        recorded for this file. Else the ETag is the sha1 of the content
+        and the date the mtime of the file, the hash is kept in FILE_ETAGS
+    """
+    path = os.path.join(mdir, fn)
+    st   = os.stat(path)
+
+    meta = hosp.read_json(os.path.join(mdir, hosp.DOWNLOAD_META)) or {}
+    meta = meta.get(fn, {})
+
+    if meta.get('size') != st.st_size:
+        meta = {}
+
+    etag = meta.get('etag')
+    if not etag:
+        key = (path, st.st_size, st.st_mtime_ns)
+        if key not in FILE_ETAGS:
+            FILE_ETAGS[key] = '"%s"' % hosp.file_hash(path)
+        etag = FILE_ETAGS[key]
+
+    modified = int(st.st_mtime)
+    if meta.get('last_modified'):
+        try:
+            modified = int(email.utils.parsedate_to_datetime(meta['last_modified']).timestamp())
+        except (TypeError, ValueError):
+            pass
+
+    return etag, modified
+
+
+def not_modified(headers, etag, modified):
+    """ True if the conditional headers of a request match the file
+    """
+    if headers.get('If-None-Match'):
+        # If-Modified-Since is ignored, if If-None-Match is given
+        tags = [ t.strip() for t in headers['If-None-Match'].split(',') ]
+        return '*' in tags or etag in tags
+
+    if headers.get('If-Modified-Since'):
+        try:
+            since = email.utils.parsedate_to_datetime(headers['If-Modified-Since']).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return modified <= since
+
+    return False
+
+
+class MirrorHandler(BaseHTTPRequestHandler):
+    """ GET and HEAD of the source files in the mirror dir
+    """
+    server_version = 'at_hosp_mirror'
+
+    def do_HEAD(self):
+        self.send_source(False)
+
+    def do_GET(self):
+        self.send_source(True)
+
+    def send_source(self, body):
+        """ send file named by the last part of the path
+        """
+        mdir = self.server.mirror_dir
+        fn   = os.path.basename(urllib.parse.urlsplit(self.path).path)
+
+        # only the source files are served
+        if fn not in hosp.SOURCE_FILES or not os.path.isfile(os.path.join(mdir, fn)):
+            self.send_error(404)
+            return
+
+        etag, modified = validators(mdir, fn)
+        headers = { 'ETag'         : etag,
+                    'Last-Modified': email.utils.formatdate(modified, usegmt=True),
+                  }
+
+        if not_modified(self.headers, etag, modified):
+            self.send_response(304)
+            for key, val in headers.items():
+                self.send_header(key, val)
+            self.end_headers()
+            return
+
+        path = os.path.join(mdir, fn)
+
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPES.get(os.path.splitext(fn)[1], 'application/octet-stream'))
+        self.send_header('Content-Length', str(os.path.getsize(path)))
+        for key, val in headers.items():
+            self.send_header(key, val)
+        self.end_headers()
+
+        if not body:
+            return
+
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(hosp.DOWNLOAD_CHUNK), b''):
+                self.wfile.write(block)
+
+    def log_message(self, fmt, *args):
+        hosp.print_dbg(hosp.VERBOSE, "%s %s" % (self.address_string(), fmt % args))
+
+
+def make_server(mdir, bind=MIRROR_BIND, port=MIRROR_PORT):
+    """ http server for the mirror dir, port 0 picks a free port
+    """
+    server = ThreadingHTTPServer((bind, port), MirrorHandler)
+    server.daemon_threads = True
+    server.mirror_dir     = mdir
+
+    return server
+
+
+def usage():
+    print("usage: %s [-d dir] [-u url] [-b address] [-p port] record|serve" % os.path.basename(sys.argv[0]))
+    print("  record             download the source files into dir")
+    print("  serve              serve the files in dir")
+    print("  -d, --dir DIR      mirror dir (default %s)" % MIRROR_DIR)
+    print("  -u, --upstream URL record from another mirror")
+    print("  -b, --bind ADDR    address to listen on (default %s)" % MIRROR_BIND)
+    print("  -p, --port PORT    port to listen on (default %s)" % MIRROR_PORT)
+
+
+# --------------------------------------------------------------------
+
+if __name__ == "__main__":
+
+    try:
+        opts, args = getopt.gnu_getopt(sys.argv[1:], "hd:u:b:p:", ["help", "dir=", "upstream=", "bind=", "port="])
+    except getopt.GetoptError as e:
+        print(e)
+        usage()
+        sys.exit(2)
+
+    mdir     = MIRROR_DIR
+    upstream = None
+    bind = MIRROR_BIND
+    port = MIRROR_PORT
+
+    for o, a in opts:
+        if o in ("-h", "--help"):
+            usage()
+            sys.exit(0)
+        elif o in ("-d", "--dir"):
+            mdir = a
+        elif o in ("-u", "--upstream"):
+            upstream = a
+        elif o in ("-b", "--bind"):
+            bind = a
+        elif o in ("-p", "--port"):
+            port = int(a)
+
+    if len(args) != 1 or args[0] not in ('record', 'serve'):
+        usage()
+        sys.exit(2)
+
+    if args[0] == 'record':
+        updated = record(mdir, upstream)
+        hosp.print_dbg(hosp.INFO, "updated: %s" % (', '.join(updated) or '-'))
+        sys.exit(0)
+
+    server = make_server(mdir, bind, port)
+    hosp.print_dbg(hosp.INFO, "serving %s on http://%s:%s/" % (mdir,bind,server.server_address[1]))
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
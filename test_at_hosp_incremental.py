@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# incremental import of the AGES csv files
+#
+#   python -m unittest test_at_hosp_incremental
+#
+#-------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import at_hosp_csv2excel as hosp
+
+
+HEADER = 'Meldedat;TestGesamt;MeldeDatum;FZHosp;FZICU;FZHospFree;FZICUFree;BundeslandID;Bundesland\n'
+
+
+def fallzahlen_rows(day, fzhosp=100):
+    """ csv rows of one report day for all Bundeslaender
+    """
+    return ''.join('%s;1000;%s 00:00:00;%d;10;50;5;%d;%s\n' % (day,day,fzhosp + i,i + 1,land)
+                   for i, land in enumerate(hosp.BUNDESLAENDER))
+
+
+class IncrementalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        hosp.configure({ 'data_dir': os.path.join(self.tmp, 'data'), 'cache': False })
+        hosp.make_data_dir()
+        hosp.INFO = hosp.VERBOSE = False
+
+    def tearDown(self):
+        hosp.INFO = hosp.VERBOSE = True
+        shutil.rmtree(self.tmp)
+
+    def write_csv(self, text):
+        with open(hosp.data_file(hosp.AGES_FALL), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def import_fallzahlen(self):
+        return hosp.import_incremental(hosp.AGES_FALL, hosp.prepare_fallzahlen, schema=hosp.CSV_SCHEMAS[hosp.AGES_FALL])
+
+    def test_appended_day(self):
+        old = HEADER + fallzahlen_rows('01.01.2023') + fallzahlen_rows('02.01.2023')
+        self.write_csv(old)
+        self.import_fallzahlen()
+
+        self.write_csv(old + fallzahlen_rows('03.01.2023', 200))
+        df = self.import_fallzahlen()
+
+        self.assertEqual(len(df), 3 * len(hosp.BUNDESLAENDER))
+        self.assertEqual(df.loc['2023-01-03', 'FZHosp'].min(), 200)
+
+    def test_value_corrected_in_place(self):
+        self.write_csv(HEADER + fallzahlen_rows('01.01.2023') + fallzahlen_rows('02.01.2023'))
+        self.import_fallzahlen()
+
+        # same number of rows, an old value changed and a day appended
+        self.write_csv(HEADER + fallzahlen_rows('01.01.2023', 600) + fallzahlen_rows('02.01.2023')
+                       + fallzahlen_rows('03.01.2023'))
+        df = self.import_fallzahlen()
+
+        full = hosp.prepare_fallzahlen(hosp.import_ages_csv2df(hosp.data_file(hosp.AGES_FALL),
+                                                               schema=hosp.CSV_SCHEMAS[hosp.AGES_FALL]))
+
+        self.assertEqual(df['FZHosp'].sum(), full['FZHosp'].sum())
+        self.assertEqual(df.loc['2023-01-01', 'FZHosp'].min(), 600)
+
+
+if __name__ == '__main__':
+    unittest.main()